@@ -0,0 +1,103 @@
+import os, sys, traceback
+from concurrent.futures import ThreadPoolExecutor
+from discovery import get_backup_tables
+from utils import get_backup_options, resolve_table_names, take_backup, write_batch_metadata_to_s3
+from context import common, alerts, shared
+
+# Backs up several tables in one run. TablesForBackup is a comma separated list of
+# table names or glob patterns (e.g. "orders,payments-*"). When it is not set,
+# tables tagged Backup=Yes are discovered instead. Tables are backed up concurrently
+# by BackupWorkers workers sharing the clients and alert sinks below. Their segment
+# scans split the client's connection pool, so tables and segments together never
+# need more connections than the pool holds.
+
+DEFAULT_BACKUP_WORKERS = 4
+
+region_name = "us-east-1"
+
+# Initializing SSM Client
+ssm_client = shared.get_client("ssm", region_name)
+config = shared.get_config("dynamodb", ssm_client)
+
+# Initiating logger, email and teams alert sinks
+logger, emailer, teams_messenger = alerts.get_alert_sinks("take-batch-backup", config)
+
+try:
+    dynamodb_client = shared.get_client('dynamodb', region_name)
+    s3_client = shared.get_client('s3', region_name)
+
+    metadata_bucket_name = config.metadata_bucket_name
+    metadata_file_key = config.metadata_file_key
+
+    selectors = [selector.strip() for selector in os.environ.get("TablesForBackup", "").split(",") if selector.strip()]
+    if len(selectors) > 0:
+        table_names = resolve_table_names(selectors, dynamodb_client)
+    else:
+        metadata_store = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client)
+        table_names = get_backup_tables(metadata_store, shared.get_client('resourcegroupstaggingapi', region_name), region_name)
+
+    if len(table_names) == 0:
+        raise Exception(f"No tables matched TablesForBackup: {selectors}" if len(selectors) > 0 else "No tables are tagged for backup")
+
+    options = get_backup_options()
+    workers = max(1, min(len(table_names), int(os.environ.get("BackupWorkers") or DEFAULT_BACKUP_WORKERS)))
+    # Every table keeps a connection for its own backup calls, the rest of the pool is shared by the segment scans
+    options["scan_workers"] = max(1, (shared.get_max_pool_connections() - workers) // workers)
+
+    def backup(table_name):
+        try:
+            record = take_backup(table_name, region_name, dynamodb_client, options)
+            logger.info(f"Backup Successfully Created for table {table_name}: {record['backup_arn']}")
+            return table_name, record, None
+        except Exception as e:
+            logger.error(f"Backup of DynamoDB table {table_name} failed. {type(e).__name__}: {e}")
+            return table_name, None, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(backup, table_names))
+
+    succeeded = {table_name: [record] for table_name, record, _ in results if record is not None}
+    failed = {table_name: error for table_name, _, error in results if error is not None}
+
+    # Single consolidated metadata write for every table that was backed up
+    write_batch_metadata_to_s3(succeeded, s3_client, metadata_bucket_name, metadata_file_key)
+
+    summary_title = "DynamoDB Batch Backup Operation Successul" if len(failed) == 0 else "DynamoDB Batch Backup Operation Partially Failed!"
+    summary_message = "\n".join(
+        [f"Backed up {len(succeeded)} of {len(table_names)} tables"]
+        + [f"{table_name}: {records[0]['backup_arn']}" for table_name, records in succeeded.items()]
+        + [f"{table_name} failed: {error}" for table_name, error in failed.items()]
+    )
+
+    # Logging Summary
+    logger.info(summary_message)
+
+    # Sending Teams Message
+    teams_messenger.send_message(title=summary_title, message=summary_message)
+
+    # Sending Email
+    if len(failed) == 0:
+        emailer.send_success_email(subject=summary_title, content=summary_message)
+    else:
+        emailer.send_failure_email(subject=summary_title, content=summary_message)
+        sys.exit(1)
+
+except Exception as e:
+    ex_type, ex, tb = sys.exc_info()
+
+    error_title = "DynamoDB Batch Backup Operation Failed!"
+    error_message = f"{ex_type}: {ex}"
+
+    # Logging Failure
+    logger.error(error_message)
+
+    # Sending Teams Message
+    teams_messenger.send_message(title=error_title, message=f"Batch backup of DynamoDB tables failed\nReason: {error_message}")
+
+    # Sending Email for Failure
+    emailer.send_failure_email(
+                    subject=error_title,
+                    content=f"Batch backup of DynamoDB tables failed\nReason: {error_message}\nTraceback: {traceback.format_exc()}"
+                )
+    traceback.print_tb(tb)
+    sys.exit(1)
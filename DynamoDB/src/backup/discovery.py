@@ -0,0 +1,51 @@
+import os, time
+from context import common
+
+# Tables carrying this tag, as written by the tagging onboarding workflow, are backed up.
+# Tag filters match values exactly, so the usual spellings of the value are all matched
+BACKUP_TAG_KEY = "Backup"
+BACKUP_TAG_VALUES = ["Yes", "yes", "YES"]
+
+# Discovered tables are reused for this long, DiscoveryTTLSeconds environment variable overrides it
+DEFAULT_DISCOVERY_TTL_SECONDS = 60 * 60
+
+def get_discovery_key(metadata_file_key):
+    return f"{common.get_metadata_prefix(metadata_file_key)}/discovery/backup-tables.json"
+
+
+def get_table_name(table_arn):
+    # arn:<partition>:dynamodb:<region>:<account>:table/<table_name>
+    return table_arn.split(":", 5)[5].split("/", 1)[1]
+
+
+def discover_backup_tables(tagging_client):
+    """Returns sorted names of tables tagged Backup=Yes, from a single paginated GetResources call"""
+
+    paginator = tagging_client.get_paginator("get_resources")
+    pages = paginator.paginate(
+        TagFilters=[{"Key": BACKUP_TAG_KEY, "Values": BACKUP_TAG_VALUES}],
+        ResourceTypeFilters=["dynamodb:table"]
+    )
+    return sorted(get_table_name(resource["ResourceARN"]) for page in pages for resource in page["ResourceTagMappingList"])
+
+
+def get_backup_tables(metadata_store, tagging_client, region, ttl_seconds=None):
+    """
+    Returns names of tables to backup, from the discovery document next to the backup metadata
+    while it is younger than ttl_seconds, discovering and storing them again otherwise
+    """
+
+    ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.environ.get("DiscoveryTTLSeconds") or DEFAULT_DISCOVERY_TTL_SECONDS)
+    discovery_key = get_discovery_key(metadata_store.metadata_file_key)
+
+    discovered = metadata_store.read_document(discovery_key, None)
+    if discovered is not None and discovered.get("region") == region and time.time() - discovered["discovered_at"] < ttl_seconds:
+        return discovered["tables"]
+
+    table_names = discover_backup_tables(tagging_client)
+    metadata_store.update_document(
+        discovery_key,
+        lambda _: {"region": region, "discovered_at": time.time(), "tables": table_names},
+        indent=4
+    )
+    return table_names
@@ -0,0 +1,90 @@
+import json, os, time
+from datetime import datetime
+from context import common
+
+# Exports of large tables take a while, their status is checked this often
+EXPORT_POLL_SECONDS = 60
+# Waiting is given up after ExportTimeoutSeconds, the export itself keeps running
+DEFAULT_EXPORT_TIMEOUT_SECONDS = 12 * 60 * 60
+
+def wait_for_export(export_arn, dynamodb_client, timeout=None):
+    """
+    timeout: Seconds to wait for, ExportTimeoutSeconds environment variable by default
+
+    Returns ExportDescription once the export finished, raises if it failed or did not finish in time
+    """
+
+    timeout = float(timeout or os.environ.get("ExportTimeoutSeconds") or DEFAULT_EXPORT_TIMEOUT_SECONDS)
+    deadline = time.monotonic() + timeout
+
+    while True:
+        export = dynamodb_client.describe_export(ExportArn=export_arn)["ExportDescription"]
+
+        if export["ExportStatus"] == "COMPLETED":
+            return export
+        if export["ExportStatus"] == "FAILED":
+            raise Exception(f"Export {export_arn} failed. {export.get('FailureCode')}: {export.get('FailureMessage')}")
+        if time.monotonic() >= deadline:
+            raise Exception(f"Export {export_arn} did not finish within {timeout:.0f} seconds, it is still {export['ExportStatus']}")
+
+        time.sleep(min(EXPORT_POLL_SECONDS, max(0, deadline - time.monotonic())))
+
+
+def read_export_manifest(export_bucket, manifest_key, s3_client):
+    """Returns parsed manifest-summary.json of an export, it holds itemCount and billedSizeBytes"""
+
+    manifest_file = s3_client.get_object(Bucket=export_bucket, Key=manifest_key)
+    return json.loads(manifest_file["Body"].read().decode())
+
+
+def export_table(table_name, dynamodb_client, s3_client, export_bucket, options):
+    """
+    table_name: Name of DynamoDB Table to export, point in time recovery must be enabled on it
+    export_bucket: S3 bucket the export is written to
+    options: Dictionary returned by get_backup_options
+
+    Exports the table to S3 and returns its backup record. Item count and size come from
+    the export manifest, so the table is not scanned and no read capacity is consumed.
+    """
+
+    if not export_bucket:
+        raise ValueError(f"ExportBucketName must be set to export table {table_name}, BackupEngine is Export")
+
+    description = common.get_table_description(table_name, dynamodb_client)
+    export_prefix = f"dynamodb-exports/{table_name}/{datetime.now().strftime('%m-%d-%Y-%H-%M-%S')}"
+
+    response = dynamodb_client.export_table_to_point_in_time(
+        TableArn=description.table_arn,
+        S3Bucket=export_bucket,
+        S3Prefix=export_prefix,
+        ExportFormat="DYNAMODB_JSON"
+    )
+    export = wait_for_export(response["ExportDescription"]["ExportArn"], dynamodb_client)
+    manifest = read_export_manifest(export_bucket, export["ExportManifest"], s3_client)
+
+    return {
+        "engine": "export",
+        "item_count": manifest["itemCount"],
+        "consumed_read_capacity": 0,
+        "gsi_count": description.gsi_count,
+        # Of the source table, restored tables have none as ImportTable can not create them
+        "lsi_count": description.lsi_count,
+        "kms_key_arn": description.kms_key_arn or 'No KMS Key',
+        "backup_arn": export["ExportArn"],
+        "timestamp": datetime.now().timestamp(),
+        "backup_creation_time": export["ExportTime"].timestamp(),
+        "backup_retention_days": options["retention_days"],
+        "export_bucket": export_bucket,
+        "export_prefix": export_prefix,
+        "export_manifest": export["ExportManifest"],
+        "export_size_bytes": manifest["billedSizeBytes"],
+        # Schema the export is imported back with, ImportTable can not create local secondary indexes
+        "table_creation_parameters": {
+            "TableName": table_name,
+            "KeySchema": description.key_schema,
+            "AttributeDefinitions": common.get_key_attribute_definitions(
+                description.attribute_definitions, description.key_schema, description.global_secondary_index_schemas
+            ),
+            "GlobalSecondaryIndexes": description.global_secondary_index_schemas
+        }
+    }
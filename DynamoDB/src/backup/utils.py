@@ -1,32 +1,171 @@
-import boto3
-import json, sys
-from context import common
+import fnmatch, logging, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from context import common, shared
+from export_engine import export_table
 
-def create_metadata_before_backup(table_name, region):
-    dynamodb_client = boto3.client('dynamodb', region)
+def create_metadata_before_backup(table_name, region, read_capacity_budget=None, compute_digest=False, sample_size=0, dynamodb_client=None, scan_workers=None, cancel_check=None):
+    """
+    table_name: Name of DynamoDB Table which we are going to backup
+    read_capacity_budget: RCU per second the counting scan may consume, unlimited when not passed
+    compute_digest: Store a digest of all items, computed in the same scan as the item count
+    sample_size: Store keys and hashes of this many random items for sample based restore validation
+    dynamodb_client: Client to reuse, e.g. across the tables of a batch backup
+    scan_workers: Most segments scanned at once, bounded by batch backups sharing the client
+    cancel_check: Called while scanning, raises to stop the scan
+    """
+    dynamodb_client = dynamodb_client or shared.get_client('dynamodb', region)
 
-    gsi_count, lsi_count, _ = common.get_table_info(table_name, dynamodb_client)
-    item_count = common.get_item_count(table_name, dynamodb_client)  
+    # Single DescribeTable call per run, shared with the read capacity budget and the scan
+    description = common.get_table_description(table_name, dynamodb_client)
+    checkpoint = common.get_scan_checkpoint(table_name, "backup", region)
+    scan_started_at = time.time()
+    scan_result = common.scan_table(table_name, dynamodb_client, read_capacity_budget=read_capacity_budget, checkpoint=checkpoint, compute_digest=compute_digest, sample_size=sample_size, max_workers=scan_workers, cancel_check=cancel_check)
+    scan_finished_at = time.time()
 
-    # Fetching table description #updated 
-    response = dynamodb_client.describe_table(TableName=table_name)
-    kms_key_arn = response['Table']['SSEDescription']['KMSMasterKeyArn'] if 'SSEDescription' in response['Table'] else 'No KMS Key'
+    kms_key_arn = description.kms_key_arn or 'No KMS Key'
 
     # Creating metadata dictionary
     metadata = {
         table_name: [
             {
-                "item_count": item_count,
-                "gsi_count": gsi_count,
-                "lsi_count": lsi_count,
+                "item_count": scan_result["item_count"],
+                "consumed_read_capacity": scan_result["consumed_read_capacity"],
+                "gsi_count": description.gsi_count,
+                "lsi_count": description.lsi_count,
                 "kms_key_arn": kms_key_arn,
+                "scan_started_at": scan_started_at,
+                "scan_finished_at": scan_finished_at,
             }
         ]
     }
 
+    if compute_digest:
+        metadata[table_name][0]["item_digest"] = scan_result["item_digest"]
+
+    if sample_size > 0:
+        metadata[table_name][0]["item_sample"] = scan_result["item_sample"]
+
     return metadata
 
 
+def get_backup_options():
+    """Returns backup options shared by single table and batch backups, read from environment variables"""
+
+    return {
+        "read_capacity_percent": os.environ.get("ScanReadCapacityPercent"),
+        "read_capacity_units": os.environ.get("ScanReadCapacityUnits"),
+        "compute_digest": os.environ.get("ComputeItemDigest", "No") == "Yes",
+        "sample_size": int(os.environ.get("ValidationSampleSize") or 0),
+        "retention_days": os.environ.get("BackupRetentionPeriod"),
+        "pipelined": os.environ.get("PipelinedBackup", "No") == "Yes",
+        # "Backup" takes a native on-demand backup, "Export" exports the table to ExportBucketName
+        "engine": os.environ.get("BackupEngine") or "Backup",
+        "export_bucket": os.environ.get("ExportBucketName"),
+        # Set by batch backups so concurrent tables stay within the shared client's connections
+        "scan_workers": None
+    }
+
+
+def check_backup_future(backup_future):
+    """Raises the error of backup_future once it failed, stopping the scan running alongside it"""
+
+    if backup_future.done():
+        backup_future.result()
+
+
+def delete_orphaned_backup(table_name, backup_future, dynamodb_client):
+    """Deletes the backup created by backup_future, if it was created at all"""
+
+    try:
+        backup_arn = backup_future.result()['BackupDetails']['BackupArn']
+    except Exception:
+        return
+
+    # Retried while the backup is still being created, it can not be deleted until then
+    logger = logging.getLogger(__name__)
+    summary = common.delete_backups([(table_name, backup_arn)], dynamodb_client, logger)
+    if len(summary["deleted"]) == 0 and len(summary["skipped"]) == 0:
+        logger.error(f"Unable to delete backup {backup_arn} of the failed backup run, delete it manually")
+
+
+def take_backup(table_name, region, dynamodb_client, options):
+    """
+    table_name: Name of DynamoDB Table to backup
+    options: Dictionary returned by get_backup_options
+
+    Captures metadata, creates the on-demand backup and returns the table's backup record.
+    With options["pipelined"] the backup is requested right away and the scan runs alongside it,
+    instead of the backup waiting for the scan. With options["engine"] set to "Export" the table
+    is exported to S3 instead, see export_engine.
+    """
+
+    if options["engine"] == "Export":
+        return export_table(table_name, dynamodb_client, shared.get_client('s3', region), options["export_bucket"], options)
+
+    # Limiting the counting scan so that it does not throttle live traffic on the table
+    read_capacity_budget = common.get_read_capacity_budget(
+        table_name,
+        dynamodb_client,
+        percent=options["read_capacity_percent"],
+        units=options["read_capacity_units"]
+    )
+
+    def create_backup():
+        return dynamodb_client.create_backup(
+            TableName=table_name,
+            BackupName="backup_"+table_name+"_"+datetime.now().strftime("%m-%d-%Y-%H-%M-%S")
+        )
+
+    def create_metadata(cancel_check=None):
+        return create_metadata_before_backup(table_name, region, read_capacity_budget, options["compute_digest"], options["sample_size"], dynamodb_client, options.get("scan_workers"), cancel_check)
+
+    if options["pipelined"]:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            backup_future = executor.submit(create_backup)
+            try:
+                # A failed backup stops the scan right away, rather than after scanning the whole table
+                metadata = create_metadata(lambda: check_backup_future(backup_future))
+            except Exception:
+                # The backup has no record to validate or expire it by, so it must not outlive the failed scan
+                delete_orphaned_backup(table_name, backup_future, dynamodb_client)
+                raise
+            backupresponse = backup_future.result()
+    else:
+        metadata = create_metadata()
+        backupresponse = create_backup()
+
+    record = metadata[table_name][0]
+    # Scan timestamps next to the backup point show how far the count may have drifted from the backup
+    record["backup_creation_time"] = backupresponse['BackupDetails']['BackupCreationDateTime'].timestamp()
+    record["backup_arn"] = backupresponse['BackupDetails']['BackupArn']
+    record["timestamp"] = datetime.now().timestamp()
+    record["backup_retention_days"] = options["retention_days"]
+
+    return record
+
+
+def resolve_table_names(selectors, dynamodb_client):
+    """
+    selectors: list of table names or glob patterns, a prefix is written as e.g. "orders-*"
+
+    Returns sorted list of matching table names, listing the account's tables only when a pattern is used
+    """
+
+    patterns = [selector for selector in selectors if any(character in selector for character in "*?[")]
+    table_names = set(selectors) - set(patterns)
+
+    if len(patterns) > 0:
+        paginator = dynamodb_client.get_paginator("list_tables")
+        for page in paginator.paginate():
+            table_names.update(
+                table_name for table_name in page["TableNames"]
+                if any(fnmatch.fnmatchcase(table_name, pattern) for pattern in patterns)
+            )
+
+    return sorted(table_names)
+
+
 def write_metadata_to_s3(metadata, table_name, region, s3_bucket_name, location, logger, teams_messenger):
     """
     table_name: Name of DynamoDB Table which we are going to backup
@@ -36,31 +175,18 @@ def write_metadata_to_s3(metadata, table_name, region, s3_bucket_name, location,
     """
     try:
         # Connection to boto3 Clients
-        s3_client = boto3.client('s3', region)
+        s3_client = shared.get_client('s3', region)
         
-        # If the JSON file exists in given location
-        if common.object_exists_in_s3(s3_bucket_name, location, s3_client):
-            existing_metadata = common.read_json_from_s3(s3_bucket_name, location, s3_client)
-
-            # If the key for operating table exists in dictionary, extend that dictionary
-            if table_name in existing_metadata.keys():
-                # Update Dictionary for that table
-                existing_metadata[table_name].extend(metadata[table_name])
-                metadata = existing_metadata
-
-            else:
-                # Add new Key to the Dictionary
-                metadata.update(existing_metadata)
-
-        # Write new/updated metadata Dictionary as JSON
-        s3_client.put_object(
-            Body=json.dumps(metadata, indent=4, sort_keys=True, default=str),
-            Bucket=s3_bucket_name,
-            Key=location
-        )
+        # Adding the backup records to the table's own metadata shard
+        metadata_store = common.get_metadata_store(s3_bucket_name, location, s3_client)
+        metadata_store.append(table_name, metadata[table_name])
+
+        # Registering expiry, so cleanup only reads backups that are due
+        expiry_entries = [common.get_backup_expiry_entry(table_name, record) for record in metadata[table_name]]
+        common.ExpiryIndex(metadata_store, common.get_expiry_prefix(location)).add([entry for entry in expiry_entries if entry is not None])
 
         success_title = "DynamoDB Metadata Created Successfully"
-        success_message = f"Metadata Created Successfully for table {table_name} on s3 https://{s3_bucket_name}.s3.amazonaws.com/{location}"
+        success_message = f"Metadata Created Successfully for table {table_name} on {metadata_store.get_location(metadata_store.get_table_key(table_name))}"
         
         # Send Logs to CW
         logger.info(success_message)
@@ -91,3 +217,23 @@ def write_metadata_to_s3(metadata, table_name, region, s3_bucket_name, location,
         teams_messenger.send_message(title=error_title, message=error_message)
 
         sys.exit(1)
+
+
+def write_batch_metadata_to_s3(records_by_table, s3_client, s3_bucket_name, location):
+    """
+    records_by_table: Dictionary of table name to list of backup records
+
+    Writes the records of every table of a batch backup, registering new tables and expiries once
+    """
+
+    metadata_store = common.get_metadata_store(s3_bucket_name, location, s3_client)
+    metadata_store.append_tables(records_by_table)
+
+    expiry_entries = [
+        common.get_backup_expiry_entry(table_name, record)
+        for table_name, records in records_by_table.items()
+        for record in records
+    ]
+    common.ExpiryIndex(metadata_store, common.get_expiry_prefix(location)).add([entry for entry in expiry_entries if entry is not None])
+
+    return metadata_store
@@ -1 +1,7 @@
-from common.common_utils import *
\ No newline at end of file
+from common.common_utils import *
+from common.cleanup_utils import *
+from common.concurrency_utils import *
+from common.metadata_utils import *
+from common.scan_utils import *
+from common.table_utils import *
+from common.export_utils import *
\ No newline at end of file
@@ -0,0 +1,318 @@
+import os, time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from shared import get_self_throttled_client
+from common.common_utils import list_backup_arns
+from common.concurrency_utils import TokenBucket, get_backoff_delay
+from common.export_utils import delete_export, export_exists, is_export_record
+from common.metadata_utils import ExpiryIndex, get_backup_expiry_entry, get_expiry_prefix, get_table_expiry_entry
+
+# DynamoDB control plane calls such as DeleteBackup and DeleteTable are limited to a few per second per account,
+# CleanupDeleteRate and CleanupWorkers environment variables override these
+DEFAULT_DELETE_RATE = 5
+DEFAULT_DELETE_WORKERS = 4
+
+# Throttled or busy resources are retried this many times before being deferred to the next run
+MAX_DELETE_ATTEMPTS = 5
+# LimitExceededException is also what DeleteTable raises when too many tables are being deleted at once
+THROTTLING_ERROR_CODES = ["ThrottlingException", "LimitExceededException"]
+
+def get_delete_settings():
+  """Returns (workers, calls per second) for deletions"""
+
+  workers = int(os.environ.get("CleanupWorkers") or DEFAULT_DELETE_WORKERS)
+  rate = float(os.environ.get("CleanupDeleteRate") or DEFAULT_DELETE_RATE)
+  return max(1, workers), rate
+
+def delete_with_retries(delete_function, dynamodb_client, token_bucket, not_found_exceptions, busy_exceptions):
+  """
+  Calls delete_function, retrying with jittered backoff when throttled or when it raises one of busy_exceptions
+
+  Returns "deleted", "skipped" if it raised one of not_found_exceptions, or "deferred" if it could not be deleted now
+  """
+
+  for attempt in range(MAX_DELETE_ATTEMPTS):
+    token_bucket.consume()
+
+    try:
+      delete_function()
+      token_bucket.recover()
+      return "deleted"
+
+    except not_found_exceptions:
+      return "skipped"
+
+    except busy_exceptions:
+      pass
+
+    except dynamodb_client.exceptions.ClientError as e:
+      if e.response["Error"]["Code"] not in THROTTLING_ERROR_CODES:
+        raise
+      token_bucket.throttle()
+
+    time.sleep(get_backoff_delay(attempt))
+
+  return "deferred"
+
+def delete_backup(backup_arn, dynamodb_client, token_bucket):
+  return delete_with_retries(
+    lambda: dynamodb_client.delete_backup(BackupArn=backup_arn),
+    dynamodb_client,
+    token_bucket,
+    (dynamodb_client.exceptions.BackupNotFoundException, dynamodb_client.exceptions.ResourceNotFoundException),
+    (dynamodb_client.exceptions.BackupInUseException,)
+  )
+
+def delete_table(table_name, dynamodb_client, token_bucket):
+  return delete_with_retries(
+    lambda: dynamodb_client.delete_table(TableName=table_name),
+    dynamodb_client,
+    token_bucket,
+    (dynamodb_client.exceptions.TableNotFoundException, dynamodb_client.exceptions.ResourceNotFoundException),
+    # Tables still being created or updated cannot be deleted yet
+    (dynamodb_client.exceptions.ResourceInUseException,)
+  )
+
+def run_deletions(items, delete_function, dynamodb_client, logger, workers=None, rate=None):
+  """
+  items: list of (name, resource) tuples, resource is passed to delete_function(resource, dynamodb_client, token_bucket)
+  workers: number of concurrent deletions
+  rate: deletions per second shared by all workers
+
+  Returns summary dictionary of "deleted", "skipped", "deferred" and "failed" lists of items
+  """
+
+  default_workers, default_rate = get_delete_settings()
+  token_bucket = TokenBucket(rate or default_rate)
+  summary = {"deleted": [], "skipped": [], "deferred": [], "failed": []}
+
+  def delete(item):
+    try:
+      return item, delete_function(item[1], dynamodb_client, token_bucket)
+    except Exception as e:
+      logger.error(f"Deletion of {item[1]} for {item[0]} failed. {type(e).__name__}: {e}")
+      return item, "failed"
+
+  with ThreadPoolExecutor(max_workers=workers or default_workers) as executor:
+    for item, outcome in executor.map(delete, items):
+      summary[outcome].append(item)
+
+  return summary
+
+def delete_backups(backups, dynamodb_client, logger, workers=None, rate=None):
+  """backups: list of (table_name, backup_arn) to delete, returns summary of run_deletions"""
+
+  # delete_with_retries backs off throttled deletions itself
+  return run_deletions(backups, delete_backup, get_self_throttled_client(dynamodb_client), logger, workers, rate)
+
+def delete_tables(table_names, dynamodb_client, logger, workers=None, rate=None):
+  """table_names: list of tables to delete, returns summary of run_deletions with (table_name, table_name) items"""
+
+  return run_deletions([(table_name, table_name) for table_name in table_names], delete_table, get_self_throttled_client(dynamodb_client), logger, workers, rate)
+
+def format_summary(summary):
+  return ", ".join(f"{len(items)} {outcome}" for outcome, items in summary.items())
+
+def cleanup_expired_backups(metadata_store, dynamodb_client, s3_client, logger, full_reconcile=False):
+  """
+  Deletes expired backups and exports and prunes them from the metadata. Only backups due in the
+  expiry index are read, unless the index does not exist yet or full_reconcile is set, which
+  reconciles every record with the backups that still exist and rebuilds the index.
+
+  Returns summary of the deletions
+  """
+
+  expiry_index = ExpiryIndex(metadata_store, get_expiry_prefix(metadata_store.metadata_file_key))
+  arns_to_prune = defaultdict(list)
+
+  if expiry_index.exists() and not full_reconcile:
+    # Only backups that are due are read, a run with nothing due stops after reading the index pointer
+    due_entries = expiry_index.get_due()
+
+  else:
+    # Full reconciliation, also (re)building the expiry index from every live backup
+    expiry_entries = []
+
+    # Tables are read one at a time, streaming their metadata log segments
+    for table_name, table_backups in metadata_store.iter_all():
+
+      # Reconciling with the backups that still exist, records of vanished ones are only pruned
+      live_arns = list_backup_arns(table_name, dynamodb_client)
+
+      for metadata in table_backups:
+        if is_export_record(metadata):
+          is_live = export_exists(metadata, s3_client)
+        else:
+          is_live = metadata["backup_arn"] in live_arns
+
+        if not is_live:
+          arns_to_prune[table_name].append(metadata["backup_arn"])
+          continue
+
+        expiry_entry = get_backup_expiry_entry(table_name, metadata)
+        if expiry_entry is None:
+          logger.error(f"Retention missing for Backup with arn {metadata['backup_arn']} for {table_name}.")
+          continue
+
+        expiry_entries.append(expiry_entry)
+
+    expiry_index.add(expiry_entries, create=True)
+    due_entries = [entry for entry in expiry_entries if entry["expires_at"] <= datetime.now().timestamp()]
+
+  # Deleting expired backups concurrently, within the control plane rate limit
+  export_entries = {entry["backup_arn"]: entry for entry in due_entries if "export_prefix" in entry}
+  summary = delete_backups([(entry["table_name"], entry["backup_arn"]) for entry in due_entries if entry["backup_arn"] not in export_entries], dynamodb_client, logger)
+
+  # Exports are deleted by removing their files from S3
+  export_summary = run_deletions(
+    [(entry["table_name"], backup_arn) for backup_arn, entry in export_entries.items()],
+    lambda backup_arn, client, token_bucket: delete_export(export_entries[backup_arn]["export_bucket"], export_entries[backup_arn]["export_prefix"], client),
+    s3_client,
+    logger
+  )
+  for outcome in summary:
+    summary[outcome] += export_summary[outcome]
+
+  for table_name, backup_arn in summary["deleted"]:
+    logger.info(f"Backup with ARN {backup_arn} for table {table_name} is Expired, and hence Deleted!")
+    arns_to_prune[table_name].append(backup_arn)
+
+  for table_name, backup_arn in summary["skipped"]:
+    logger.error(f"Backup with arn {backup_arn} for {table_name} was Deleted Before Expiration.")
+    arns_to_prune[table_name].append(backup_arn)
+
+  for table_name, backup_arn in summary["deferred"]:
+    logger.error(f"Backup with arn {backup_arn} for {table_name} is in use or throttled, hence cannot be deleted now, it will be retried on the next run.")
+
+  # Removing deleted and vanished backups from the metadata in a single write per table
+  for table_name in arns_to_prune:
+    metadata_store.delete(table_name, arns_to_prune[table_name])
+    logger.info(f"Pruned {len(arns_to_prune[table_name])} deleted backups from metadata of table {table_name}")
+
+  # Deferred and failed backups stay in the expiry index, so the next run picks them up again
+  finished_arns = set(backup_arn for _, backup_arn in summary["deleted"] + summary["skipped"])
+  expiry_index.remove([entry for entry in due_entries if entry["backup_arn"] in finished_arns])
+
+  logger.info(f"Backup cleanup finished: {format_summary(summary)}, {sum(len(arns) for arns in arns_to_prune.values())} pruned from metadata")
+
+  return summary
+
+def write_table_retention(metadata_store, table_name, days_to_retain, creation_date_time=None):
+  """
+  metadata_store: Store of the retention config
+  days_to_retain: Days the restored table is kept for, "0" keeps it forever
+  creation_date_time: Creation time in "%d-%m-%y %H:%M:%S", now when not passed
+
+  Sets the table's retention, replacing any earlier one, and moves its expiry index entry along
+  """
+
+  table_config = {
+    "creation_date_time": creation_date_time or datetime.now().strftime("%d-%m-%y %H:%M:%S"),
+    "days_to_retain": days_to_retain
+  }
+  previous_configs = []
+
+  def merge_config(existing_config):
+    # The conditional write may run this more than once, only the config it was finally applied to counts
+    previous_configs[:] = [existing_config.get(table_name)]
+    return {**existing_config, table_name: table_config}
+
+  # Conditionally merging into the existing config, so concurrent restores do not drop each other's entries
+  metadata_store.update_document(metadata_store.metadata_file_key, merge_config, default={}, indent=4)
+
+  # The previous entry may sit in another day's shard, or the table may now be kept forever
+  expiry_index = ExpiryIndex(metadata_store, get_expiry_prefix(metadata_store.metadata_file_key))
+  previous_entry = get_table_expiry_entry(table_name, previous_configs[0]) if previous_configs and previous_configs[0] else None
+  if previous_entry is not None:
+    expiry_index.remove([previous_entry])
+
+  expiry_entry = get_table_expiry_entry(table_name, table_config)
+  if expiry_entry is not None:
+    expiry_index.add([expiry_entry])
+
+def get_current_due_entries(metadata_store, due_entries, expiry_index, now=None):
+  """
+  Returns the due entries which still match the retention config. Entries left behind by a changed
+  or removed retention are removed from the index, so a table is never deleted on an outdated retention.
+  """
+
+  now = now if now is not None else time.time()
+  retention_config = metadata_store.read_document(metadata_store.metadata_file_key, {})
+
+  current_entries = []
+  stale_entries = []
+  rescheduled_entries = []
+  for entry in due_entries:
+    table_config = retention_config.get(entry["table_name"])
+    current_entry = get_table_expiry_entry(entry["table_name"], table_config) if table_config is not None else None
+
+    if current_entry is not None and current_entry["expires_at"] == entry["expires_at"]:
+      current_entries.append(entry)
+    else:
+      stale_entries.append(entry)
+      if current_entry is not None and current_entry["expires_at"] <= now:
+        current_entries.append(current_entry)
+      elif current_entry is not None:
+        rescheduled_entries.append(current_entry)
+
+  expiry_index.remove(stale_entries)
+  if len(rescheduled_entries) > 0:
+    expiry_index.add(rescheduled_entries)
+  return current_entries
+
+def cleanup_expired_tables(metadata_store, dynamodb_client, logger, full_reconcile=False):
+  """
+  metadata_store: Store of the retention config, see write_retention_config
+
+  Deletes expired restored tables and removes them from the retention config. Only tables due in
+  the expiry index are read, unless the index does not exist yet or full_reconcile is set.
+
+  Returns summary of the deletions
+  """
+
+  expiry_index = ExpiryIndex(metadata_store, get_expiry_prefix(metadata_store.metadata_file_key))
+
+  if expiry_index.exists() and not full_reconcile:
+    # Only tables that are due are read, a run with nothing due stops after reading the index pointer
+    due_entries = expiry_index.get_due()
+    if len(due_entries) > 0:
+      due_entries = get_current_due_entries(metadata_store, due_entries, expiry_index)
+
+  else:
+    # Building the expiry index from the whole retention config, tables retained forever are left out
+    retention_config = metadata_store.read_document(metadata_store.metadata_file_key, {})
+    expiry_entries = [get_table_expiry_entry(table_name, retention_config[table_name]) for table_name in retention_config]
+    expiry_entries = [entry for entry in expiry_entries if entry is not None]
+
+    expiry_index.add(expiry_entries, create=True)
+    due_entries = [entry for entry in expiry_entries if entry["expires_at"] <= datetime.now().timestamp()]
+
+  # Deleting expired tables concurrently, bounded by CleanupWorkers and CleanupDeleteRate
+  entries_by_table = {entry["table_name"]: entry for entry in due_entries}
+  summary = delete_tables(list(entries_by_table), dynamodb_client, logger)
+
+  for table_name, _ in summary["deleted"]:
+    logger.info(f"Table {table_name} is Expired, and hence Deleted!")
+
+  for table_name, _ in summary["skipped"]:
+    logger.error(f"Table with name {table_name} was Deleted Before Expiration.")
+
+  for table_name, _ in summary["deferred"]:
+    logger.error(f"Table with name {table_name} is in use or throttled, hence cannot be deleted now, it will be retried on the next run.")
+
+  # Rewriting the retention config once, without deleted and missing tables
+  removed_tables = set(table_name for table_name, _ in summary["deleted"] + summary["skipped"])
+  if len(removed_tables) > 0:
+    metadata_store.update_document(
+      metadata_store.metadata_file_key,
+      lambda existing_config: {table_name: config for table_name, config in existing_config.items() if table_name not in removed_tables},
+      default={},
+      indent=4
+    )
+
+  expiry_index.remove([entries_by_table[table_name] for table_name in removed_tables])
+
+  logger.info(f"Restored table cleanup finished: {format_summary(summary)}")
+
+  return summary
@@ -1,7 +1,7 @@
-import boto3
-import json
-import requests
-from datetime import datetime
+import shared
+from common.table_utils import TABLE_DESCRIPTION_TTL_SECONDS, get_table_description
+# JSON documents on S3 are read and updated through shared, re-exported here for existing callers
+from shared.s3_json import fetch_json_from_s3, get_json_with_etag_from_s3, read_json_from_s3, update_json_in_s3
 
 def get_parameter_from_ssm(parameter_name, ssm_client, with_decryption=False):
   """
@@ -18,47 +18,41 @@ def object_exists_in_s3(s3_bucket, s3_key, s3_client):
   s3_key: loaction of the file
   s3_client: boto3 S3 Client Object
 
-  Returns Boolean
+  Returns Boolean, True only if an object with exactly this key exists
   """
 
-  response = s3_client.list_objects(
-    Bucket = s3_bucket,
-    Prefix = s3_key
-    )
-  if 'ETag' in str(response):
+  # HEAD on the exact key, a prefix listing would also match e.g. "metadata.json.bak"
+  try:
+    s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
     return True
-  else:
-    return False
+  except s3_client.exceptions.ClientError as e:
+    if e.response["Error"]["Code"] in ["404", "NoSuchKey", "NotFound"]:
+      return False
+    raise
     
-def get_table_info(table_name, dynamodb_client):
-  """returns gsi_count, lsi_count, table_status"""
-
-  # Fetching Table information
-  response = dynamodb_client.describe_table(TableName=table_name)
-
-  gsi_count = len(response['Table']['GlobalSecondaryIndexes']) if 'GlobalSecondaryIndexes' in response['Table'].keys() else 0
-  lsi_count = len(response['Table']['LocalSecondaryIndexes']) if 'LocalSecondaryIndexes' in response['Table'].keys() else 0
-  status = response['Table']['TableStatus']
+def get_table_info(table_name, dynamodb_client, max_age=TABLE_DESCRIPTION_TTL_SECONDS):
+  """
+  max_age: Seconds a cached table description may be old, see get_table_description
 
-  return gsi_count, lsi_count, status
+  returns gsi_count, lsi_count, table_status
+  """
 
-def get_item_count(table_name, dynamodb_client):
-  scan = dynamodb_client.scan(TableName=table_name, Select='COUNT')
-  count = scan["Count"]
+  # Fetching Table information
+  description = get_table_description(table_name, dynamodb_client, max_age)
 
-  while 'LastEvaluatedKey' in scan:
-    scan = dynamodb_client.scan(TableName=table_name, ExclusiveStartKey=scan['LastEvaluatedKey'], Select='COUNT')
-    count = count + scan["Count"]
+  return description.gsi_count, description.lsi_count, description.status
 
-  return count
+def list_backup_arns(table_name, dynamodb_client):
+  """Returns set of ARNs of the table's on-demand backups that still exist, following every page of ListBackups"""
 
-def read_json_from_s3(metadata_bucket_name, metadata_file_key, s3_client):
-  json_file = s3_client.get_object(Bucket=metadata_bucket_name, Key=metadata_file_key)
-  parsed_data = json.loads(json_file["Body"].read().decode())
-  
-  return parsed_data
+  paginator = dynamodb_client.get_paginator("list_backups")
+  return set(
+    backup["BackupArn"]
+    for page in paginator.paginate(TableName=table_name, BackupType="USER")
+    for backup in page["BackupSummaries"]
+  )
 
 def get_region():
-  r = requests.get("http://169.254.169.254/latest/dynamic/instance-identity/document")
-  response_json = r.json()
-  return response_json.get('region')
+  """Returns region of this process, see shared.get_region"""
+
+  return shared.get_region()
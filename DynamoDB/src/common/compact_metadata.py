@@ -0,0 +1,33 @@
+import sys, traceback
+from context import common, alerts, shared
+
+# Folds the metadata log segments of every table into its snapshot.
+# Safe to run while backups are writing, segments added meanwhile are left for the next run.
+
+try:
+    region = common.get_region()
+
+    s3_client = shared.get_client('s3', region)
+    ssm_client = shared.get_client("ssm", region)
+    config = shared.get_config("dynamodb", ssm_client)
+
+    # Initiating logger
+    logger = alerts.get_alert_sinks("compact-metadata", config).logger
+
+    metadata_bucket_name = config.metadata_bucket_name
+    metadata_file_key = config.metadata_file_key
+
+    metadata_store = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client)
+
+    for table_name in metadata_store.list_tables():
+        folded_segments = metadata_store.compact(table_name)
+        if folded_segments > 0:
+            logger.info(f"Compacted {folded_segments} metadata log segments of table {table_name}")
+
+except Exception as e:
+    ex_type, ex, tb = sys.exc_info()
+    error_message = f"Metadata Compaction Failed! {ex_type}: {ex}"
+    logger.error(error_message)
+
+    traceback.print_tb(tb)
+    sys.exit(1)
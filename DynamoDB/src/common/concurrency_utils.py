@@ -0,0 +1,64 @@
+import random, threading, time
+
+class TokenBucket():
+  """
+  Thread safe token bucket shared by all workers of an operation.
+
+  Tokens are spent after the fact when the cost of a request is only known
+  from its response (e.g. ConsumedCapacity), so the bucket can go into debt.
+  Workers then sleep until the debt is paid back at the current rate.
+  """
+
+  # Rate never drops below this fraction of the configured rate when throttled
+  MIN_RATE_FRACTION = 0.1
+  # Fraction of the configured rate given back after every successful request
+  RECOVERY_FRACTION = 0.05
+
+  def __init__(self, rate, capacity=None) -> None:
+    """
+    rate: tokens refilled per second
+    capacity: maximum burst size, defaults to one second worth of tokens
+    """
+
+    self.max_rate = float(rate)
+    self.rate = float(rate)
+    self.capacity = float(capacity) if capacity is not None else float(rate)
+    self.tokens = self.capacity
+    self.updated_at = time.monotonic()
+    self.lock = threading.Lock()
+
+  def _refill(self):
+    now = time.monotonic()
+    self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+    self.updated_at = now
+
+  def consume(self, amount=1):
+    """Spends amount tokens and blocks while the bucket is in debt"""
+
+    with self.lock:
+      self._refill()
+      self.tokens -= amount
+      wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+
+    if wait_time > 0:
+      time.sleep(wait_time)
+
+  def throttle(self):
+    """Halves the refill rate, called when the server reports throttling"""
+
+    with self.lock:
+      self._refill()
+      self.rate = max(self.max_rate * self.MIN_RATE_FRACTION, self.rate / 2)
+
+  def recover(self):
+    """Grows the refill rate back towards the configured rate"""
+
+    with self.lock:
+      if self.rate < self.max_rate:
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVERY_FRACTION)
+
+def get_backoff_delay(attempt, base_delay=0.5, max_delay=20):
+  """Returns exponential backoff delay with full jitter for the given attempt"""
+
+  return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
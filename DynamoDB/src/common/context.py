@@ -1,7 +1,12 @@
 import sys
 import os
 
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
 sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '../../..')))
 
-import alerts
\ No newline at end of file
+import common
+import alerts
+import shared
@@ -0,0 +1,56 @@
+import posixpath
+from common.common_utils import object_exists_in_s3
+
+#############################################################################
+# Backups taken by the export engine are DynamoDB exports to S3. Their
+# metadata records have the same fields as native backups, backup_arn holds
+# the export ARN and these fields locate the export:
+#
+#   engine: "export" (records without it are native backups)
+#   export_bucket, export_prefix: where the export was written
+#   export_manifest: key of the export's manifest-summary.json
+#############################################################################
+
+def is_export_arn(backup_arn):
+  # e.g. arn:aws:dynamodb:us-east-1:123456789012:table/orders/export/01234567890123-abcdefgh
+  return "/export/" in backup_arn
+
+def is_export_record(record):
+  return record.get("engine") == "export"
+
+def get_export_data_prefix(record):
+  """Returns S3 prefix of the export's data files, as ImportTable takes it"""
+
+  return posixpath.dirname(record["export_manifest"]) + "/data/"
+
+def get_key_attribute_definitions(attribute_definitions, key_schema, global_secondary_indexes=()):
+  """
+  Returns the attribute definitions used by the table's or a global secondary index's key schema.
+  ImportTable rejects definitions of any other attribute, e.g. the sort key of a local secondary index.
+  """
+
+  key_attributes = set(key["AttributeName"] for key in key_schema)
+  for index in global_secondary_indexes:
+    key_attributes.update(key["AttributeName"] for key in index["KeySchema"])
+
+  return [definition for definition in attribute_definitions if definition["AttributeName"] in key_attributes]
+
+def export_exists(record, s3_client):
+  return object_exists_in_s3(record["export_bucket"], record["export_manifest"], s3_client)
+
+def delete_export(export_bucket, export_prefix, s3_client):
+  """
+  Deletes every object of an export
+
+  Returns "deleted", or "skipped" if nothing was left under the export prefix
+  """
+
+  deleted_objects = 0
+  paginator = s3_client.get_paginator("list_objects_v2")
+  for page in paginator.paginate(Bucket=export_bucket, Prefix=export_prefix.rstrip("/") + "/"):
+    keys = [item["Key"] for item in page.get("Contents", [])]
+    if len(keys) > 0:
+      s3_client.delete_objects(Bucket=export_bucket, Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True})
+      deleted_objects += len(keys)
+
+  return "deleted" if deleted_objects > 0 else "skipped"
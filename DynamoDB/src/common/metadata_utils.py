@@ -0,0 +1,691 @@
+import bisect, copy, gzip, io, json, os, posixpath, threading, time, uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from urllib.parse import quote
+from shared.s3_json import get_json_with_etag_from_s3, update_json_in_s3
+
+#############################################################################
+# Backup metadata is sharded into one object per table, next to a small
+# manifest listing the tables, all under the prefix of the metadata file key:
+#
+#   <prefix>/manifest.json
+#   <prefix>/tables/<table_name>.json
+#   <prefix>/tables/<table_name>/log/<time_ns>-<uuid>.jsonl.gz
+#   <prefix>/tables/<table_name>/lookup/latest.json
+#   <prefix>/tables/<table_name>/lookup/backups/<quoted backup_arn>.json
+#   <prefix>/expiry/next_due.json
+#   <prefix>/expiry/days/<YYYY-MM-DD>.json
+#
+# e.g. metadata file key "dynamodb/metadata.json" gives prefix "dynamodb/metadata"
+#
+# The table's JSON document is a snapshot, a list of records sorted by timestamp.
+# Writes never rewrite it, each write adds a new gzip compressed JSON Lines
+# segment to the table's log instead, one event per line:
+#
+#   {"op": "put", "record": {...}}
+#   {"op": "delete", "backup_arn": "..."}
+#
+# Readers replay the log over the snapshot, events are keyed by backup_arn so
+# replaying a segment twice is harmless. Compaction folds the log into the
+# snapshot and deletes the folded segments.
+#
+# Every write also updates the table's lookup documents, {"record": ...} of its
+# latest backup and of each backup ARN (None once deleted), so finding the latest
+# backup or one backup reads a single small document instead of the history.
+# Backups recorded before lookups existed fall back to replaying the history.
+#
+# The expiry documents index backups by the day they expire, see ExpiryIndex.
+#
+# MetadataStore implements this layout on top of document and segment
+# primitives provided by S3MetadataStore and LocalMetadataStore.
+#############################################################################
+
+def get_metadata_prefix(metadata_file_key):
+  return posixpath.splitext(metadata_file_key)[0]
+
+def get_manifest_key(metadata_file_key):
+  return f"{get_metadata_prefix(metadata_file_key)}/manifest.json"
+
+def get_table_metadata_key(metadata_file_key, table_name):
+  return f"{get_metadata_prefix(metadata_file_key)}/tables/{table_name}.json"
+
+def get_table_log_prefix(metadata_file_key, table_name):
+  return f"{get_metadata_prefix(metadata_file_key)}/tables/{table_name}/log/"
+
+def get_table_lookup_prefix(metadata_file_key, table_name):
+  return f"{get_metadata_prefix(metadata_file_key)}/tables/{table_name}/lookup"
+
+def get_expiry_prefix(metadata_file_key):
+  return f"{get_metadata_prefix(metadata_file_key)}/expiry"
+
+def get_segment_name():
+  # Time ordered, so listing the log returns segments in write order
+  return f"{time.time_ns():020d}-{uuid.uuid4().hex}.jsonl.gz"
+
+# Reads which raced a compaction are started over this many times
+MAX_INDEX_READ_ATTEMPTS = 5
+
+class SegmentCompactedError(Exception):
+  """A listed log segment was folded into the snapshot and deleted before it could be read"""
+
+def encode_segment(events):
+  body = "".join(json.dumps(event, sort_keys=True, separators=(",", ":"), default=str) + "\n" for event in events)
+  return gzip.compress(body.encode())
+
+class BackupIndex():
+  """
+  Backup records of one table indexed by backup_arn, plus (timestamp, backup_arn)
+  pairs kept sorted. Once built, a lookup by ARN is O(1) and the latest backup or
+  the nearest backup before a time is O(log n). Building it is not: it reads the
+  whole snapshot and replays every uncompacted log event, so its cost grows with
+  the table's history and the log is kept short by compaction.
+  Log events are applied incrementally.
+  """
+
+  def __init__(self, records=()) -> None:
+    self.records_by_arn = {record["backup_arn"]: record for record in records}
+    # Sorted once, snapshots are already in timestamp order so this is close to linear
+    self.timeline = sorted((record.get("timestamp", 0), backup_arn) for backup_arn, record in self.records_by_arn.items())
+
+  def put(self, record):
+    if record["backup_arn"] in self.records_by_arn:
+      self.remove(record["backup_arn"])
+
+    self.records_by_arn[record["backup_arn"]] = record
+    bisect.insort(self.timeline, (record.get("timestamp", 0), record["backup_arn"]))
+
+  def remove(self, backup_arn):
+    record = self.records_by_arn.pop(backup_arn, None)
+    if record is None:
+      return
+
+    position = bisect.bisect_left(self.timeline, (record.get("timestamp", 0), backup_arn))
+    del self.timeline[position]
+
+  def apply(self, events):
+    for event in events:
+      if event["op"] == "put":
+        self.put(event["record"])
+      elif event["op"] == "delete":
+        self.remove(event["backup_arn"])
+
+  def get(self, backup_arn):
+    """Returns record of the backup, None if it is not known"""
+    return self.records_by_arn.get(backup_arn)
+
+  def latest(self):
+    """Returns most recent record, None if there are no backups"""
+    return self.records_by_arn[self.timeline[-1][1]] if self.timeline else None
+
+  def latest_before(self, timestamp):
+    """Returns most recent record taken at or before timestamp, None if there is none"""
+
+    position = bisect.bisect_right(self.timeline, (timestamp, chr(0x10FFFF)))
+    return self.records_by_arn[self.timeline[position - 1][1]] if position > 0 else None
+
+  def records(self):
+    """Returns list of records sorted by timestamp"""
+    return [self.records_by_arn[backup_arn] for _, backup_arn in self.timeline]
+
+  def __contains__(self, backup_arn):
+    return backup_arn in self.records_by_arn
+
+  def __len__(self):
+    return len(self.records_by_arn)
+
+class MetadataStore(ABC):
+  """Typed access to backup metadata, subclasses provide the document and log segment primitives"""
+
+  def __init__(self, metadata_file_key) -> None:
+    self.metadata_file_key = metadata_file_key
+
+    # BackupIndex of every table read by this store, kept current with the store's own writes
+    self.table_indexes = {}
+    self.table_indexes_lock = threading.Lock()
+
+  @abstractmethod
+  def read_document(self, key, default=None):
+    """Returns JSON document stored at key with a single read, a copy of default if it does not exist"""
+
+  @abstractmethod
+  def update_document(self, key, update_function, default=None, indent=None):
+    """
+    update_function: Receives the current document (or a copy of default if it does not exist) and returns the updated one
+
+    Must not lose updates of concurrent writers. Returns the written document
+    """
+
+  @abstractmethod
+  def write_segment(self, key, body):
+    """Writes a new log segment, segments are never overwritten"""
+
+  @abstractmethod
+  def list_segments(self, prefix):
+    """Returns sorted keys of log segments under prefix"""
+
+  @abstractmethod
+  def open_segment(self, key):
+    """Returns binary stream of a log segment, None if it was compacted away"""
+
+  @abstractmethod
+  def delete_segments(self, keys):
+    """Deletes log segments folded into the snapshot"""
+
+  def get_location(self, key):
+    """Returns human readable location of a document, used in alerts"""
+    return key
+
+  def get_table_key(self, table_name):
+    return get_table_metadata_key(self.metadata_file_key, table_name)
+
+  def get_latest_lookup_key(self, table_name):
+    return f"{get_table_lookup_prefix(self.metadata_file_key, table_name)}/latest.json"
+
+  def get_backup_lookup_key(self, table_name, backup_arn):
+    return f"{get_table_lookup_prefix(self.metadata_file_key, table_name)}/backups/{quote(backup_arn, safe='')}.json"
+
+  def read_manifest(self):
+    """Returns manifest dictionary: {"tables": {table_name: {"key", "updated_at"}}}"""
+
+    return self.read_document(get_manifest_key(self.metadata_file_key), {"tables": {}})
+
+  def list_tables(self):
+    return list(self.read_manifest()["tables"])
+
+  def update_manifest(self, table_names):
+    """Adds or refreshes manifest entries of the given tables"""
+
+    def update_entries(manifest):
+      for table_name in table_names:
+        manifest["tables"][table_name] = {
+          "key": self.get_table_key(table_name),
+          "updated_at": datetime.now().timestamp()
+        }
+      return manifest
+
+    self.update_document(get_manifest_key(self.metadata_file_key), update_entries, {"tables": {}})
+
+  def read_snapshot(self, table_name):
+    return self.read_document(self.get_table_key(table_name), [])
+
+  def iter_events(self, table_name, segment_keys=None, skip_missing=True):
+    """
+    Streams log events of a table, one segment and one line at a time
+
+    skip_missing: Skip segments deleted since they were listed, raises SegmentCompactedError otherwise
+    """
+
+    if segment_keys is None:
+      segment_keys = self.list_segments(get_table_log_prefix(self.metadata_file_key, table_name))
+
+    for segment_key in segment_keys:
+      segment = self.open_segment(segment_key)
+      if segment is None:
+        if skip_missing:
+          continue
+        raise SegmentCompactedError(segment_key)
+
+      with gzip.GzipFile(fileobj=segment) as lines:
+        for line in lines:
+          yield json.loads(line)
+
+  def get_table_index(self, table_name, refresh=False):
+    """
+    Returns BackupIndex of the table. It is built from the snapshot and log once per store,
+    pass refresh=True to pick up writes made by other processes since then. Building it reads
+    the whole snapshot and uncompacted log, only lookups on the built index are cheap.
+    """
+
+    with self.table_indexes_lock:
+      if refresh or table_name not in self.table_indexes:
+        self.table_indexes[table_name] = self.build_table_index(table_name)
+
+      return self.table_indexes[table_name]
+
+  def build_table_index(self, table_name):
+    """
+    Reads the snapshot and replays the log over it. The log is listed before the snapshot is read,
+    so a compaction finishing in between only means listed segments were already folded into the
+    snapshot. Replaying them again is harmless, and if one is already deleted the read starts over.
+    """
+
+    for attempt in range(MAX_INDEX_READ_ATTEMPTS):
+      segment_keys = self.list_segments(get_table_log_prefix(self.metadata_file_key, table_name))
+      index = BackupIndex(self.read_snapshot(table_name))
+
+      try:
+        index.apply(self.iter_events(table_name, segment_keys, skip_missing=False))
+        return index
+      except SegmentCompactedError:
+        continue
+
+    raise Exception(f"Unable to read metadata of table {table_name}, it was compacted during {MAX_INDEX_READ_ATTEMPTS} reads")
+
+  def read_table(self, table_name):
+    """Returns list of backup records of a table sorted by timestamp, empty list if the table has no metadata"""
+
+    return self.get_table_index(table_name).records()
+
+  def get_backup(self, table_name, backup_arn):
+    """Returns record of the backup, None if the table has no metadata for it. Reads its lookup document"""
+
+    lookup = self.read_document(self.get_backup_lookup_key(table_name, backup_arn))
+    if lookup is not None:
+      return lookup["record"]
+
+    return self.get_table_index(table_name).get(backup_arn)
+
+  def get_latest_backup(self, table_name):
+    """Returns most recent backup record of the table, None if it has none. Reads the latest lookup document"""
+
+    lookup = self.read_document(self.get_latest_lookup_key(table_name))
+    if lookup is not None:
+      return lookup["record"]
+
+    return self.get_table_index(table_name).latest()
+
+  def get_backup_before(self, table_name, timestamp):
+    """Returns most recent backup record of the table taken at or before timestamp, None if there is none"""
+
+    return self.get_table_index(table_name).latest_before(timestamp)
+
+  def iter_all(self):
+    """Yields (table name, list of backup records) for every table in the manifest, one table at a time"""
+
+    for table_name in self.list_tables():
+      yield table_name, self.read_table(table_name)
+
+  def read_all(self):
+    """Returns dictionary of table name to list of backup records for every table in the manifest"""
+
+    return dict(self.iter_all())
+
+  def append_events(self, table_name, events):
+    """Adds a log segment holding events, the cost does not depend on the table's history"""
+
+    self.append_table_events({table_name: events})
+
+  def append_table_events(self, events_by_table):
+    """Adds one log segment per table, tables new to the manifest are registered with a single write"""
+
+    events_by_table = {table_name: events for table_name, events in events_by_table.items() if len(events) > 0}
+
+    for table_name, events in events_by_table.items():
+      self.write_segment(get_table_log_prefix(self.metadata_file_key, table_name) + get_segment_name(), encode_segment(events))
+
+      with self.table_indexes_lock:
+        if table_name in self.table_indexes:
+          self.table_indexes[table_name].apply(events)
+
+      self.update_lookups(table_name, events)
+
+    # Manifest is a cached read, and only rewritten for tables it does not know yet
+    known_tables = self.read_manifest()["tables"]
+    new_tables = [table_name for table_name in events_by_table if table_name not in known_tables]
+    if len(new_tables) > 0:
+      self.update_manifest(new_tables)
+
+  def update_lookups(self, table_name, events):
+    """Writes lookup documents of the backups in events, and the latest lookup when it changed"""
+
+    records_by_arn = {}
+    for event in events:
+      if event["op"] == "put":
+        records_by_arn[event["record"]["backup_arn"]] = event["record"]
+      elif event["op"] == "delete":
+        records_by_arn[event["backup_arn"]] = None
+
+    for backup_arn, record in records_by_arn.items():
+      self.update_document(self.get_backup_lookup_key(table_name, backup_arn), lambda _, record=record: {"record": record})
+
+    newest = max(
+      (record for record in records_by_arn.values() if record is not None),
+      key=lambda record: record.get("timestamp", 0),
+      default=None
+    )
+
+    def update_latest(lookup):
+      # Written before lookups existed, or the latest backup itself changed: the history knows what is latest now,
+      # and it already holds the events' segment
+      if lookup is None or (lookup["record"] is not None and lookup["record"]["backup_arn"] in records_by_arn):
+        return {"record": self.build_table_index(table_name).latest()}
+
+      if newest is not None and (lookup["record"] is None or newest.get("timestamp", 0) >= lookup["record"].get("timestamp", 0)):
+        return {"record": newest}
+      return lookup
+
+    self.update_document(self.get_latest_lookup_key(table_name), update_latest)
+
+  def append(self, table_name, records):
+    """Adds backup records to the table's log"""
+
+    self.append_events(table_name, [{"op": "put", "record": record} for record in records])
+    return records
+
+  def append_tables(self, records_by_table):
+    """Adds backup records of several tables, e.g. from a batch backup"""
+
+    self.append_table_events({
+      table_name: [{"op": "put", "record": record} for record in records]
+      for table_name, records in records_by_table.items()
+    })
+    return records_by_table
+
+  def delete(self, table_name, backup_arns):
+    """Removes backup records from the table's metadata"""
+
+    self.append_events(table_name, [{"op": "delete", "backup_arn": backup_arn} for backup_arn in backup_arns])
+
+  def update_table(self, table_name, update_function):
+    """
+    update_function: Receives the table's list of backup records and returns the updated list
+
+    Logs the difference as put and delete events, returns the updated list of records
+    """
+
+    existing_records = {record["backup_arn"]: record for record in self.read_table(table_name)}
+    updated_records = {record["backup_arn"]: record for record in update_function(copy.deepcopy(list(existing_records.values())))}
+
+    events = [{"op": "delete", "backup_arn": backup_arn} for backup_arn in existing_records if backup_arn not in updated_records]
+    events += [{"op": "put", "record": record} for backup_arn, record in updated_records.items() if existing_records.get(backup_arn) != record]
+    self.append_events(table_name, events)
+
+    return BackupIndex(updated_records.values()).records()
+
+  def compact(self, table_name):
+    """
+    Folds the table's log into its snapshot and deletes the folded segments.
+    Segments written meanwhile are left for the next compaction.
+
+    Returns number of folded segments
+    """
+
+    segment_keys = self.list_segments(get_table_log_prefix(self.metadata_file_key, table_name))
+    if len(segment_keys) == 0:
+      return 0
+
+    def fold_segments(snapshot):
+      index = BackupIndex(snapshot)
+      index.apply(self.iter_events(table_name, segment_keys))
+      return index.records()
+
+    self.update_document(self.get_table_key(table_name), fold_segments, [])
+    self.delete_segments(segment_keys)
+
+    return len(segment_keys)
+
+  def migrate(self):
+    """
+    Splits the monolithic metadata file into per table shards and writes the manifest.
+    Records already present in a shard are kept, so running it again is harmless.
+
+    Returns list of migrated table names
+    """
+
+    monolithic_metadata = self.read_document(self.metadata_file_key, {})
+
+    for table_name, records in monolithic_metadata.items():
+      def merge_records(existing_records, records=records):
+        existing_arns = set(record.get("backup_arn") for record in existing_records)
+        return existing_records + [record for record in records if record.get("backup_arn") not in existing_arns]
+
+      self.update_table(table_name, merge_records)
+
+    return list(monolithic_metadata.keys())
+
+class S3MetadataStore(MetadataStore):
+  """Documents are S3 objects, reads are single cached GETs and writes are ETag conditional"""
+
+  def __init__(self, s3_bucket, metadata_file_key, s3_client) -> None:
+    super().__init__(metadata_file_key)
+    self.s3_bucket = s3_bucket
+    self.s3_client = s3_client
+
+  def read_document(self, key, default=None):
+    data, _ = get_json_with_etag_from_s3(self.s3_bucket, key, self.s3_client)
+    return data if data is not None else copy.deepcopy(default)
+
+  def update_document(self, key, update_function, default=None, indent=None):
+    return update_json_in_s3(self.s3_bucket, key, update_function, self.s3_client, default=default, indent=indent)
+
+  def write_segment(self, key, body):
+    self.s3_client.put_object(Body=body, Bucket=self.s3_bucket, Key=key, IfNoneMatch="*")
+
+  def list_segments(self, prefix):
+    paginator = self.s3_client.get_paginator("list_objects_v2")
+    return sorted(
+      item["Key"]
+      for page in paginator.paginate(Bucket=self.s3_bucket, Prefix=prefix)
+      for item in page.get("Contents", [])
+    )
+
+  def open_segment(self, key):
+    try:
+      return self.s3_client.get_object(Bucket=self.s3_bucket, Key=key)["Body"]
+    except self.s3_client.exceptions.NoSuchKey:
+      return None
+
+  def delete_segments(self, keys):
+    # DeleteObjects takes up to 1000 keys per call
+    for start in range(0, len(keys), 1000):
+      self.s3_client.delete_objects(
+        Bucket=self.s3_bucket,
+        Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True}
+      )
+
+  def get_location(self, key):
+    return f"https://{self.s3_bucket}.s3.amazonaws.com/{key}"
+
+class LocalMetadataStore(MetadataStore):
+  """Documents are files under a local directory, for local runs and trying changes without S3"""
+
+  # Writers are serialized within the process, which is all a local run needs
+  write_lock = threading.Lock()
+
+  def __init__(self, root_dir, metadata_file_key) -> None:
+    super().__init__(metadata_file_key)
+    self.root_dir = root_dir
+
+  def get_path(self, key):
+    return os.path.join(self.root_dir, *key.split("/"))
+
+  def read_document(self, key, default=None):
+    try:
+      with open(self.get_path(key)) as document_file:
+        return json.load(document_file)
+    except FileNotFoundError:
+      return copy.deepcopy(default)
+
+  def update_document(self, key, update_function, default=None, indent=None):
+    path = self.get_path(key)
+
+    with self.write_lock:
+      updated_data = update_function(self.read_document(key, default))
+
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      with open(f"{path}.tmp", "w") as document_file:
+        json.dump(updated_data, document_file, indent=indent, sort_keys=True, default=str)
+      os.replace(f"{path}.tmp", path)
+
+    return updated_data
+
+  def write_segment(self, key, body):
+    path = self.get_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "xb") as segment_file:
+      segment_file.write(body)
+
+  def list_segments(self, prefix):
+    directory = self.get_path(prefix)
+    if not os.path.isdir(directory):
+      return []
+    return sorted(prefix + name for name in os.listdir(directory) if name.endswith(".jsonl.gz"))
+
+  def open_segment(self, key):
+    try:
+      with open(self.get_path(key), "rb") as segment_file:
+        return io.BytesIO(segment_file.read())
+    except FileNotFoundError:
+      return None
+
+  def delete_segments(self, keys):
+    for key in keys:
+      try:
+        os.remove(self.get_path(key))
+      except FileNotFoundError:
+        pass
+
+  def get_location(self, key):
+    return self.get_path(key)
+
+class ExpiryIndex():
+  """
+  Entries ({"id", "expires_at", ...}) sharded into one document per expiry day (UTC),
+  next to a small pointer document holding the sorted list of days and the earliest
+  expiry time. A run with nothing due only reads the pointer.
+
+  Entries stay in the index until they are removed, so work deferred by a run is due again on the next one.
+  """
+
+  def __init__(self, metadata_store, prefix) -> None:
+    self.metadata_store = metadata_store
+    self.prefix = prefix
+    self.pointer_key = f"{prefix}/next_due.json"
+
+  def get_day(self, timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+  def get_day_key(self, day):
+    return f"{self.prefix}/days/{day}.json"
+
+  def read_pointer(self):
+    """Returns {"days": [...], "next_due": timestamp or None}, None if the index was never built"""
+    return self.metadata_store.read_document(self.pointer_key, None)
+
+  def exists(self):
+    return self.read_pointer() is not None
+
+  def add(self, entries, create=False):
+    """
+    Adds or replaces entries. Without create the index is left alone when it was never built,
+    it is then built in full by the next cleanup run.
+    """
+
+    if not create and not self.exists():
+      return
+
+    entries_by_day = {}
+    for entry in entries:
+      entries_by_day.setdefault(self.get_day(entry["expires_at"]), {})[entry["id"]] = entry
+
+    for day, day_entries in entries_by_day.items():
+      self.metadata_store.update_document(self.get_day_key(day), lambda shard, day_entries=day_entries: {**shard, **day_entries}, {})
+
+    def add_days(pointer):
+      earliest = min([entry["expires_at"] for entry in entries] + ([pointer["next_due"]] if pointer["next_due"] is not None else []), default=None)
+      return {"days": sorted(set(pointer["days"]) | set(entries_by_day)), "next_due": earliest}
+
+    self.metadata_store.update_document(self.pointer_key, add_days, {"days": [], "next_due": None})
+
+  def get_due(self, now=None):
+    """Returns entries expired at now (defaults to current time) sorted by expiry, reading only shards of past days"""
+
+    now = now if now is not None else time.time()
+    pointer = self.read_pointer()
+    if pointer is None or pointer["next_due"] is None or pointer["next_due"] > now:
+      return []
+
+    today = self.get_day(now)
+    due_entries = []
+    for day in pointer["days"]:
+      if day > today:
+        break
+      shard = self.metadata_store.read_document(self.get_day_key(day), {})
+      due_entries += [entry for entry in shard.values() if entry["expires_at"] <= now]
+
+    return sorted(due_entries, key=lambda entry: entry["expires_at"])
+
+  def remove(self, entries):
+    """Removes entries, then drops emptied days and moves the next due time forward"""
+
+    ids_by_day = {}
+    for entry in entries:
+      ids_by_day.setdefault(self.get_day(entry["expires_at"]), set()).add(entry["id"])
+
+    for day, ids in ids_by_day.items():
+      self.metadata_store.update_document(
+        self.get_day_key(day),
+        lambda shard, ids=ids: {entry_id: entry for entry_id, entry in shard.items() if entry_id not in ids},
+        {}
+      )
+
+    def refresh_pointer(pointer):
+      # Shards are re-read here, so a day refilled by a concurrent writer is kept
+      days = []
+      next_due = None
+      for day in pointer["days"]:
+        shard = self.metadata_store.read_document(self.get_day_key(day), {})
+        if len(shard) == 0:
+          continue
+        days.append(day)
+        if next_due is None:
+          next_due = min(entry["expires_at"] for entry in shard.values())
+      return {"days": days, "next_due": next_due}
+
+    if len(ids_by_day) > 0:
+      self.metadata_store.update_document(self.pointer_key, refresh_pointer, {"days": [], "next_due": None})
+
+def get_retention_days(value):
+  """Returns retention in days, None when it is not set or not a whole number, e.g. an empty workflow input"""
+
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return None
+
+def get_backup_expiry_entry(table_name, record):
+  """Returns ExpiryIndex entry of a backup record, None if the record has no retention"""
+
+  retention_days = get_retention_days(record.get("backup_retention_days"))
+  if record.get("timestamp") is None or retention_days is None:
+    return None
+
+  entry = {
+    "id": record["backup_arn"],
+    "table_name": table_name,
+    "backup_arn": record["backup_arn"],
+    "expires_at": record["timestamp"] + retention_days * 24 * 60 * 60
+  }
+
+  # Exports are deleted from S3, so their entries carry the export location
+  if record.get("engine") == "export":
+    entry["export_bucket"] = record["export_bucket"]
+    entry["export_prefix"] = record["export_prefix"]
+
+  return entry
+
+def get_table_expiry_entry(table_name, table_config):
+  """Returns ExpiryIndex entry of a restored table's retention config, None if it is retained forever"""
+
+  retention_days = get_retention_days(table_config.get("days_to_retain"))
+  if retention_days is None or retention_days == 0:
+    return None
+
+  creation_datetime = datetime.strptime(table_config["creation_date_time"], "%d-%m-%y %H:%M:%S")
+  return {
+    "id": table_name,
+    "table_name": table_name,
+    "expires_at": creation_datetime.timestamp() + retention_days * 24 * 60 * 60
+  }
+
+def get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client):
+  """
+  Returns S3MetadataStore for the metadata bucket, or LocalMetadataStore
+  rooted at MetadataStoreDir environment variable when it is set
+  """
+
+  local_dir = os.environ.get("MetadataStoreDir")
+  if local_dir:
+    return LocalMetadataStore(local_dir, metadata_file_key)
+
+  return S3MetadataStore(metadata_bucket_name, metadata_file_key, s3_client)
@@ -0,0 +1,29 @@
+import sys, traceback
+from context import common, alerts, shared
+
+# One-shot migration of the monolithic metadata file into per table shards and a manifest.
+# The monolithic file is left in place, so it can be removed once the shards are verified.
+
+try:
+    region = common.get_region()
+
+    s3_client = shared.get_client('s3', region)
+    ssm_client = shared.get_client("ssm", region)
+    config = shared.get_config("dynamodb", ssm_client)
+
+    # Initiating logger
+    logger = alerts.get_alert_sinks("migrate-metadata", config).logger
+
+    metadata_bucket_name = config.metadata_bucket_name
+    metadata_file_key = config.metadata_file_key
+
+    migrated_tables = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client).migrate()
+    logger.info(f"Migrated metadata of {len(migrated_tables)} tables from {metadata_file_key} to {common.get_metadata_prefix(metadata_file_key)}/")
+
+except Exception as e:
+    ex_type, ex, tb = sys.exc_info()
+    error_message = f"Metadata Migration Failed! {ex_type}: {ex}"
+    logger.error(error_message)
+
+    traceback.print_tb(tb)
+    sys.exit(1)
@@ -0,0 +1,493 @@
+import base64, hashlib, heapq, json, logging, math, os, random, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from common.concurrency_utils import TokenBucket, get_backoff_delay
+from common.table_utils import get_table_description
+from shared import get_client, get_self_throttled_client
+
+# DynamoDB recommends roughly one parallel scan segment per 2 GB of table data
+SEGMENT_SIZE_BYTES = 2 * 1024 ** 3
+MAX_TOTAL_SEGMENTS = 1000
+
+# Scans are network bound, so we run a few segments per available core
+SCAN_WORKERS_PER_CORE = 4
+
+# Number of times a throttled scan page is retried before giving up
+MAX_THROTTLE_RETRIES = 10
+
+# Scan progress is persisted at most this often
+CHECKPOINT_INTERVAL_SECONDS = 60
+# Checkpoints older than this are discarded instead of resumed
+CHECKPOINT_MAX_AGE_SECONDS = 24 * 60 * 60
+DEFAULT_CHECKPOINT_DIR = os.path.join(tempfile.gettempdir(), "dynamodb-scan-checkpoints")
+
+def encode_attribute_value(value):
+  """Converts a typed AttributeValue into a JSON serializable dictionary, binary values are base64 encoded"""
+
+  (data_type, data), = value.items()
+  if data_type == "B":
+    return {"B": base64.b64encode(data).decode()}
+  if data_type == "BS":
+    return {"BS": [base64.b64encode(item).decode() for item in data]}
+  if data_type == "M":
+    return {"M": {name: encode_attribute_value(item) for name, item in data.items()}}
+  if data_type == "L":
+    return {"L": [encode_attribute_value(item) for item in data]}
+  return value
+
+def decode_attribute_value(value):
+  """Reverse of encode_attribute_value"""
+
+  (data_type, data), = value.items()
+  if data_type == "B":
+    return {"B": base64.b64decode(data)}
+  if data_type == "BS":
+    return {"BS": [base64.b64decode(item) for item in data]}
+  if data_type == "M":
+    return {"M": {name: decode_attribute_value(item) for name, item in data.items()}}
+  if data_type == "L":
+    return {"L": [decode_attribute_value(item) for item in data]}
+  return value
+
+# Per item hashes are summed modulo 2^256, so the digest does not depend on scan order
+DIGEST_MODULUS = 2 ** 256
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_ITEM_SIZE = 100
+MAX_BATCH_GET_WORKERS = 16
+# Confidence level reported by sample based validation
+SAMPLE_CONFIDENCE = 0.95
+
+def canonicalize_attribute_value(value):
+  """Returns encoded AttributeValue with set members sorted, so equal items always serialize the same way"""
+
+  (data_type, data), = encode_attribute_value(value).items()
+  if data_type in ["SS", "NS", "BS"]:
+    return {data_type: sorted(data)}
+  if data_type == "M":
+    return {"M": {name: canonicalize_attribute_value(item) for name, item in value["M"].items()}}
+  if data_type == "L":
+    return {"L": [canonicalize_attribute_value(item) for item in value["L"]]}
+  return {data_type: data}
+
+def get_item_hash(item):
+  """Returns sha256 of the canonicalized item as an integer"""
+
+  canonical_item = json.dumps(
+    {name: canonicalize_attribute_value(value) for name, value in item.items()},
+    sort_keys=True,
+    separators=(",", ":")
+  )
+  return int.from_bytes(hashlib.sha256(canonical_item.encode()).digest(), "big")
+
+def format_digest(digest):
+  return format(digest % DIGEST_MODULUS, "064x")
+
+def get_key_string(key):
+  """Returns canonical string of a primary key, used to match sampled keys with fetched items"""
+
+  return json.dumps(encode_key(key), sort_keys=True, separators=(",", ":"))
+
+def encode_key(key):
+  return {name: encode_attribute_value(value) for name, value in key.items()} if key is not None else None
+
+def decode_key(key):
+  return {name: decode_attribute_value(value) for name, value in key.items()} if key is not None else None
+
+class ScanCheckpoint():
+  """
+  Persists per segment progress of a scan to a local file or an S3 object,
+  so that an interrupted scan can continue where it stopped.
+  """
+
+  def __init__(self, location, s3_client=None, interval=CHECKPOINT_INTERVAL_SECONDS, max_age=CHECKPOINT_MAX_AGE_SECONDS) -> None:
+    """
+    location: Local file path or s3://bucket/key
+    s3_client: boto3 S3 Client Object, required for S3 locations
+    """
+
+    self.location = location
+    self.s3_client = s3_client
+    self.interval = interval
+    self.max_age = max_age
+    self.state = None
+    self.saved_at = 0
+    self.lock = threading.Lock()
+    self.write_lock = threading.Lock()
+
+  def _split_s3_location(self):
+    bucket, _, key = self.location[len("s3://"):].partition("/")
+    return bucket, key
+
+  def _read(self):
+    if self.location.startswith("s3://"):
+      bucket, key = self._split_s3_location()
+      try:
+        response = self.s3_client.get_object(Bucket=bucket, Key=key)
+      except self.s3_client.exceptions.NoSuchKey:
+        return None
+      return json.loads(response["Body"].read().decode())
+
+    if not os.path.exists(self.location):
+      return None
+    with open(self.location) as checkpoint_file:
+      return json.load(checkpoint_file)
+
+  def _write(self, body):
+    if self.location.startswith("s3://"):
+      bucket, key = self._split_s3_location()
+      self.s3_client.put_object(Body=body, Bucket=bucket, Key=key)
+      return
+
+    os.makedirs(os.path.dirname(os.path.abspath(self.location)), exist_ok=True)
+    temp_location = f"{self.location}.tmp"
+    with open(temp_location, "w") as checkpoint_file:
+      checkpoint_file.write(body)
+    os.replace(temp_location, self.location)
+
+  def load(self, table_name, compute_digest=False, sample_size=0):
+    """Returns saved state of an unfinished scan of table_name, None if there is nothing to resume"""
+
+    state = self._read()
+    if state is None or state.get("table_name") != table_name:
+      return None
+    if state.get("compute_digest", False) != compute_digest or state.get("sample_size", 0) != sample_size:
+      return None
+    if time.time() - state.get("started_at", 0) > self.max_age:
+      return None
+
+    for segment_state in state["segments"]:
+      if segment_state is not None:
+        segment_state["last_evaluated_key"] = decode_key(segment_state["last_evaluated_key"])
+    return state
+
+  def start(self, state):
+    self.state = state
+    self.saved_at = time.monotonic()
+
+  def update(self, segment, segment_state):
+    """Records progress of one segment and saves the checkpoint if the interval has passed"""
+
+    with self.lock:
+      self.state["segments"][segment] = segment_state
+      if time.monotonic() - self.saved_at < self.interval:
+        return
+      self.saved_at = time.monotonic()
+
+    self.save()
+
+  def save(self):
+    # Segments keep scanning while one of them writes the checkpoint, writes themselves are serialized
+    with self.write_lock:
+      with self.lock:
+        body = json.dumps({
+          **self.state,
+          "segments": [
+            {**segment_state, "last_evaluated_key": encode_key(segment_state["last_evaluated_key"])} if segment_state is not None else None
+            for segment_state in self.state["segments"]
+          ]
+        })
+      self._write(body)
+
+  def clear(self):
+    if self.location.startswith("s3://"):
+      bucket, key = self._split_s3_location()
+      self.s3_client.delete_object(Bucket=bucket, Key=key)
+    elif os.path.exists(self.location):
+      os.remove(self.location)
+
+def get_scan_checkpoint(table_name, purpose, region=None):
+  """
+  table_name: Name of table being scanned
+  purpose: Name of the operation scanning the table, keeps checkpoints of different operations apart
+
+  Checkpoints are kept under ScanCheckpointLocation environment variable (local directory or s3://bucket/prefix),
+  or in the temp directory by default. Setting ScanCheckpointLocation to "None" disables checkpointing.
+  """
+
+  base_location = os.environ.get("ScanCheckpointLocation") or DEFAULT_CHECKPOINT_DIR
+  if base_location == "None":
+    return None
+
+  if base_location.startswith("s3://"):
+    return ScanCheckpoint(f"{base_location.rstrip('/')}/{purpose}/{table_name}.json", s3_client=get_client('s3', region))
+
+  return ScanCheckpoint(os.path.join(base_location, purpose, f"{table_name}.json"))
+
+def get_total_segments(table_size_bytes, max_segments=MAX_TOTAL_SEGMENTS):
+  """
+  table_size_bytes: TableSizeBytes from describe_table
+
+  Returns number of segments to split the scan into
+  """
+
+  segments = math.ceil(table_size_bytes / SEGMENT_SIZE_BYTES)
+  return max(1, min(segments, max_segments))
+
+def get_scan_workers(total_segments, max_workers=None):
+  """
+  Returns size of the thread pool used to scan total_segments segments,
+  at most max_workers when the caller shares its connections with other scans
+  """
+
+  workers = min(total_segments, (os.cpu_count() or 1) * SCAN_WORKERS_PER_CORE)
+  if max_workers is not None:
+    workers = min(workers, max_workers)
+  return max(1, workers)
+
+def get_read_capacity_budget(table_name, dynamodb_client, percent=None, units=None):
+  """
+  percent: Percentage of the provisioned read capacity the scan may use
+  units: Absolute RCU per second budget, used for on-demand tables or when percent is not passed
+
+  Returns RCU per second budget for a scan, None means unlimited
+  """
+
+  if percent not in [None, ""]:
+    provisioned_rcu = get_table_description(table_name, dynamodb_client).provisioned_read_capacity
+
+    # On-demand tables report 0 provisioned capacity
+    if provisioned_rcu > 0:
+      return provisioned_rcu * float(percent) / 100
+
+    if units in [None, ""]:
+      logging.getLogger(__name__).warning(
+        f"Table {table_name} is on-demand, so the {percent}% read capacity limit does not apply and the scan is unlimited. "
+        "Set ScanReadCapacityUnits to limit it."
+      )
+
+  if units not in [None, ""]:
+    return float(units)
+
+  return None
+
+def scan_page(dynamodb_client, scan_kwargs, token_bucket=None):
+  """Fetches one scan page, backing off and slowing the token bucket down when throttled"""
+
+  attempt = 0
+  while True:
+    try:
+      page = dynamodb_client.scan(ReturnConsumedCapacity='TOTAL', **scan_kwargs)
+      break
+    except dynamodb_client.exceptions.ProvisionedThroughputExceededException:
+      attempt += 1
+      if attempt > MAX_THROTTLE_RETRIES:
+        raise
+
+      if token_bucket is not None:
+        token_bucket.throttle()
+      time.sleep(get_backoff_delay(attempt))
+
+  if token_bucket is not None:
+    token_bucket.recover()
+    token_bucket.consume(page.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+
+  return page
+
+def add_to_sample(sample, item, key_attributes, sample_size):
+  """
+  Keeps the sample_size items with the smallest random priorities in sample, which is a heap of
+  [-priority, item_hash, key] lists. Segments are sampled independently and merged by priority,
+  which gives a uniform sample of the whole table.
+  """
+
+  priority = random.random()
+  if len(sample) >= sample_size and -sample[0][0] <= priority:
+    return
+
+  entry = [-priority, format_digest(get_item_hash(item)), encode_key({name: item[name] for name in key_attributes})]
+  if len(sample) >= sample_size:
+    heapq.heapreplace(sample, entry)
+  else:
+    heapq.heappush(sample, entry)
+
+def scan_segment(table_name, dynamodb_client, segment=0, total_segments=1, token_bucket=None, segment_state=None, checkpoint=None, compute_digest=False, sample_size=0, key_attributes=None, cancel_check=None):
+  """
+  Counts items of a single scan segment, one page at a time.
+  segment_state: Progress saved by an earlier run to continue from
+  checkpoint: ScanCheckpoint which is updated after every page
+  compute_digest: Also sum up hashes of the scanned items
+  sample_size: Also keep a random sample of this many item keys and hashes
+  key_attributes: Names of the primary key attributes, required for sampling
+  cancel_check: Called before every page, raises to stop the scan
+  """
+
+  # Counting reads the same data as fetching the items, so the digest and sample cost no extra capacity
+  fetch_items = compute_digest or sample_size > 0
+  scan_kwargs = {"TableName": table_name} if fetch_items else {"TableName": table_name, "Select": "COUNT"}
+  if total_segments > 1:
+    scan_kwargs.update(Segment=segment, TotalSegments=total_segments)
+
+  result = segment_state or {"item_count": 0, "consumed_read_capacity": 0, "item_digest": 0, "item_sample": [], "last_evaluated_key": None, "done": False}
+
+  while not result["done"]:
+    if result["last_evaluated_key"] is not None:
+      scan_kwargs["ExclusiveStartKey"] = result["last_evaluated_key"]
+
+    if cancel_check is not None:
+      cancel_check()
+
+    page = scan_page(dynamodb_client, scan_kwargs, token_bucket)
+    item_digest = result["item_digest"]
+    if compute_digest:
+      item_digest = (item_digest + sum(get_item_hash(item) for item in page["Items"])) % DIGEST_MODULUS
+
+    item_sample = list(result["item_sample"])
+    if sample_size > 0:
+      for item in page["Items"]:
+        add_to_sample(item_sample, item, key_attributes, sample_size)
+
+    result = {
+      "item_count": result["item_count"] + page["Count"],
+      "consumed_read_capacity": result["consumed_read_capacity"] + page.get('ConsumedCapacity', {}).get('CapacityUnits', 0),
+      "item_digest": item_digest,
+      "item_sample": item_sample,
+      "last_evaluated_key": page.get('LastEvaluatedKey'),
+      "done": 'LastEvaluatedKey' not in page
+    }
+
+    if checkpoint is not None:
+      checkpoint.update(segment, result)
+
+  return result
+
+def scan_table(table_name, dynamodb_client, total_segments=None, read_capacity_budget=None, checkpoint=None, compute_digest=False, sample_size=0, max_workers=None, cancel_check=None):
+  """
+  table_name: Name of table to scan
+  dynamodb_client: boto3 DynamoDB Client Object
+  total_segments: Number of parallel scan segments, picked from the table size when not passed
+  read_capacity_budget: RCU per second the scan may consume, unlimited when not passed
+  checkpoint: ScanCheckpoint to resume from and save progress to
+  compute_digest: Compute an order independent digest of all items in the same scan
+  sample_size: Number of random item keys and hashes to collect in the same scan
+  max_workers: Most segments scanned at once, see get_scan_workers
+  cancel_check: Called before every page, raises to stop the scan, e.g. when work running alongside it failed.
+  The checkpoint keeps the progress made until then
+
+  Returns dictionary with item_count, consumed_read_capacity, item_digest (None unless compute_digest is set)
+  and item_sample (list of {"key", "item_hash"}, empty unless sample_size is set)
+  """
+
+  state = checkpoint.load(table_name, compute_digest, sample_size) if checkpoint is not None else None
+
+  key_attributes = None
+  if state is None or sample_size > 0:
+    description = get_table_description(table_name, dynamodb_client)
+    key_attributes = description.key_attributes
+
+  if state is not None:
+    # Segments of a resumed scan must match the saved ones, whatever the current table size is
+    total_segments = state["total_segments"]
+  else:
+    if total_segments is None:
+      total_segments = get_total_segments(description.size_bytes)
+
+    state = {
+      "table_name": table_name,
+      "total_segments": total_segments,
+      "compute_digest": compute_digest,
+      "sample_size": sample_size,
+      "started_at": time.time(),
+      "segments": [None] * total_segments
+    }
+
+  if checkpoint is not None:
+    checkpoint.start(state)
+
+  token_bucket = TokenBucket(read_capacity_budget) if read_capacity_budget else None
+  saved_segments = list(state["segments"])
+
+  # boto3 clients are thread safe, so all segments share the same client. scan_page backs off throttled
+  # pages itself, so the segments scan with a client that does not retry them again underneath
+  scan_client = get_self_throttled_client(dynamodb_client)
+
+  try:
+    with ThreadPoolExecutor(max_workers=get_scan_workers(total_segments, max_workers)) as executor:
+      segment_results = list(executor.map(
+        lambda segment: scan_segment(
+          table_name,
+          scan_client,
+          segment,
+          total_segments,
+          token_bucket=token_bucket,
+          segment_state=saved_segments[segment],
+          checkpoint=checkpoint,
+          compute_digest=compute_digest,
+          sample_size=sample_size,
+          key_attributes=key_attributes,
+          cancel_check=cancel_check
+        ),
+        range(total_segments)
+      ))
+
+  except BaseException:
+    if checkpoint is not None:
+      checkpoint.save()
+    raise
+
+  if checkpoint is not None:
+    checkpoint.clear()
+
+  # Items with the smallest priorities across all segments form the table wide sample
+  item_sample = heapq.nlargest(sample_size, (entry for result in segment_results for entry in result["item_sample"])) if sample_size > 0 else []
+
+  return {
+    "item_count": sum(result["item_count"] for result in segment_results),
+    "consumed_read_capacity": sum(result["consumed_read_capacity"] for result in segment_results),
+    "item_digest": format_digest(sum(result["item_digest"] for result in segment_results)) if compute_digest else None,
+    "item_sample": [{"key": key, "item_hash": item_hash} for _, item_hash, key in item_sample]
+  }
+
+def get_item_count(table_name, dynamodb_client, total_segments=None, read_capacity_budget=None, checkpoint=None):
+  """Returns number of items in the table, see scan_table for arguments"""
+
+  return scan_table(table_name, dynamodb_client, total_segments, read_capacity_budget, checkpoint)["item_count"]
+
+def batch_get_items(table_name, dynamodb_client, keys):
+  """Fetches up to 100 items by key, retrying unprocessed keys with backoff"""
+
+  items = []
+  request_items = {table_name: {"Keys": keys}}
+  attempt = 0
+
+  while request_items:
+    response = dynamodb_client.batch_get_item(RequestItems=request_items)
+    items.extend(response["Responses"].get(table_name, []))
+    request_items = response.get("UnprocessedKeys") or {}
+
+    if request_items:
+      attempt += 1
+      if attempt > MAX_THROTTLE_RETRIES:
+        raise Exception(f"Unable to fetch {len(request_items[table_name]['Keys'])} sampled items from table {table_name}")
+      time.sleep(get_backoff_delay(attempt))
+
+  return items
+
+def verify_item_sample(table_name, dynamodb_client, item_sample):
+  """
+  table_name: Name of table to verify
+  item_sample: Sample recorded by scan_table on the source table
+
+  Fetches sampled items with parallel BatchGetItem calls and compares their hashes.
+  Returns dictionary with sample_size, matched, mismatched, missing and max_differing_fraction,
+  which is the largest fraction of differing items still consistent with a clean sample at SAMPLE_CONFIDENCE.
+  """
+
+  expected_hashes = {get_key_string(decode_key(entry["key"])): entry["item_hash"] for entry in item_sample}
+  keys = [decode_key(entry["key"]) for entry in item_sample]
+  key_attributes = list(keys[0].keys()) if keys else []
+  batches = [keys[index:index + BATCH_GET_ITEM_SIZE] for index in range(0, len(keys), BATCH_GET_ITEM_SIZE)]
+
+  result = {"sample_size": len(keys), "matched": 0, "mismatched": 0, "missing": 0}
+
+  with ThreadPoolExecutor(max_workers=max(1, min(len(batches), MAX_BATCH_GET_WORKERS))) as executor:
+    for items in executor.map(lambda batch: batch_get_items(table_name, dynamodb_client, batch), batches):
+      for item in items:
+        key_string = get_key_string({name: item[name] for name in key_attributes})
+        if expected_hashes.pop(key_string, None) == format_digest(get_item_hash(item)):
+          result["matched"] += 1
+        else:
+          result["mismatched"] += 1
+
+  result["missing"] = len(expected_hashes)
+  result["max_differing_fraction"] = 1 - (1 - SAMPLE_CONFIDENCE) ** (1 / len(keys)) if keys else 1
+  return result
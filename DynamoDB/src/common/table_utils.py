@@ -0,0 +1,70 @@
+import threading, time
+
+# DescribeTable responses are reused for this long within a run, unless a caller asks for a fresher one
+TABLE_DESCRIPTION_TTL_SECONDS = 300
+
+# TableDescription objects keyed by (region, table name), kept as (described_at, description)
+table_description_cache = {}
+table_description_cache_lock = threading.Lock()
+
+class TableDescription():
+  """Fields of a DescribeTable response used across backup, restore and list"""
+
+  def __init__(self, table) -> None:
+    """table: 'Table' dictionary of a DescribeTable response"""
+
+    self.table_name = table["TableName"]
+    self.table_arn = table.get("TableArn")
+    self.status = table["TableStatus"]
+    self.key_schema = table.get("KeySchema", [])
+    self.key_attributes = [key["AttributeName"] for key in self.key_schema]
+    self.attribute_definitions = table.get("AttributeDefinitions", [])
+    # Index schemas without their runtime state, in the shape CreateTable and ImportTable take
+    self.global_secondary_index_schemas = [
+      {"IndexName": index["IndexName"], "KeySchema": index["KeySchema"], "Projection": index["Projection"]}
+      for index in table.get("GlobalSecondaryIndexes", [])
+    ]
+    self.global_secondary_indexes = [index["IndexName"] for index in table.get("GlobalSecondaryIndexes", [])]
+    self.local_secondary_indexes = [index["IndexName"] for index in table.get("LocalSecondaryIndexes", [])]
+    self.size_bytes = table.get("TableSizeBytes", 0)
+    self.item_count = table.get("ItemCount", 0)
+    # On-demand tables report 0 provisioned capacity
+    self.provisioned_read_capacity = table.get("ProvisionedThroughput", {}).get("ReadCapacityUnits", 0)
+    self.sse_status = table.get("SSEDescription", {}).get("Status")
+    self.kms_key_arn = table.get("SSEDescription", {}).get("KMSMasterKeyArn")
+
+  @property
+  def gsi_count(self):
+    return len(self.global_secondary_indexes)
+
+  @property
+  def lsi_count(self):
+    return len(self.local_secondary_indexes)
+
+def get_table_description(table_name, dynamodb_client, max_age=TABLE_DESCRIPTION_TTL_SECONDS):
+  """
+  max_age: Seconds a cached description may be old, 0 always calls DescribeTable (e.g. while polling status)
+
+  Returns TableDescription of the table, described at most once per max_age
+  """
+
+  cache_key = (getattr(getattr(dynamodb_client, "meta", None), "region_name", None), table_name)
+
+  with table_description_cache_lock:
+    cached = table_description_cache.get(cache_key)
+  if cached is not None and time.monotonic() - cached[0] < max_age:
+    return cached[1]
+
+  description = TableDescription(dynamodb_client.describe_table(TableName=table_name)["Table"])
+
+  with table_description_cache_lock:
+    table_description_cache[cache_key] = (time.monotonic(), description)
+  return description
+
+def invalidate_table_description(table_name=None):
+  """Drops the cached description of a table, or of every table when table_name is not passed"""
+
+  with table_description_cache_lock:
+    for cache_key in list(table_description_cache):
+      if table_name is None or cache_key[1] == table_name:
+        del table_description_cache[cache_key]
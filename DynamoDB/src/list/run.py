@@ -1,34 +1,30 @@
-import boto3
 import os, sys, traceback
 from datetime import datetime
-from context import common, alerts
+from context import common, alerts, shared
 
 region = 'us-east-1'
-s3_client = boto3.client('s3', region)
-ssm_client = boto3.client('ssm', region)
+s3_client = shared.get_client('s3', region)
+ssm_client = shared.get_client('ssm', region)
 
-log_group_name = common.get_parameter_from_ssm("dynamodb-bnr-log-grp-name", ssm_client)
+config = shared.get_config("dynamodb", ssm_client)
 
-logger = alerts.Logger(
-     logger_name = "list-backups",
-     log_group_name = log_group_name
-).get_logger()
+# Initiating logger
+logger = alerts.get_alert_sinks("list-backups", config).logger
 
 
 try:
 
     table_name = os.environ.get("TableNameForBackup")
-    metadata_bucket_name = common.get_parameter_from_ssm("dynamodb-metadata-bucket-name", ssm_client)
-    metadata_file_key = common.get_parameter_from_ssm("dynamodb-metadata-file-key", ssm_client)
+    metadata_bucket_name = config.metadata_bucket_name
+    metadata_file_key = config.metadata_file_key
 
-    backup_dict = common.read_json_from_s3(metadata_bucket_name, metadata_file_key, s3_client)
+    table_backups = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client).read_table(table_name)
 
-    if table_name in backup_dict.keys() and len(backup_dict[table_name]) > 0:
+    if len(table_backups) > 0:
 
-        dynamodb_client = boto3.client('dynamodb', 'us-east-1')
+        dynamodb_client = shared.get_client('dynamodb', 'us-east-1')
 
-        actual_backups = dynamodb_client.list_backups(TableName=table_name)
-        actual_arns = [backup['BackupArn'] for backup in actual_backups['BackupSummaries']]
+        actual_arns = common.list_backup_arns(table_name, dynamodb_client)
 
         logger.info(f"Listing Available Backups for table {table_name}")
 
@@ -36,15 +32,15 @@ try:
         print("{:<10} {:<10} {:<10} {:<25} {:<25}".format('ITEM COUNT', 'GSI COUNT', 'LSI COUNT', 'TIMESTAMP', 'BACKUP ARN'))
         print('-'*150)
 
-        for backup_info in backup_dict[table_name]:
+        for backup_info in table_backups:
             print('-'*150)
             
             # print each data item.
-            key, value = zip(*backup_info.items())
-            backup_arn, backup_retention_days, gsi_count, item_count, kms_key_arn, lsi_count, timestamp = value
-            if backup_arn in actual_arns:
+            backup_arn = backup_info["backup_arn"]
+            # Exports are not listed as backups, they exist as long as their files in S3 do
+            if backup_arn in actual_arns or (common.is_export_record(backup_info) and common.export_exists(backup_info, s3_client)):
                 #logger.info("\n{:<10} {:<10} {:<10} {:<20} {:<10}".format(item_count, gsi_count, lsi_count, timestamp, backup_arn))
-                print("{:<10} {:<10} {:<10} {:<25} {:<25}".format(item_count, gsi_count, lsi_count, datetime.fromtimestamp(timestamp).strftime('%d-%m-%y %H:%M:%S'), backup_arn))
+                print("{:<10} {:<10} {:<10} {:<25} {:<25}".format(backup_info["item_count"], backup_info["gsi_count"], backup_info["lsi_count"], datetime.fromtimestamp(backup_info["timestamp"]).strftime('%d-%m-%y %H:%M:%S'), backup_arn))
 
     else:
         print("No Existing Metadata found for selected Table")
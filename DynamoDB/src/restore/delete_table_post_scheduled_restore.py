@@ -1,33 +1,21 @@
-import boto3
 import os, sys, traceback
-from context import common, alerts
+from context import common, alerts, shared
 
 try:
     region = "us-east-1"
 
     # Initializing SSM Client
-    s3_client = boto3.client('s3', region)
-    ssm_client = boto3.client("ssm", region_name=region)
-    log_group_name = common.get_parameter_from_ssm("dynamodb-bnr-log-grp-name", ssm_client)
+    s3_client = shared.get_client('s3', region)
+    ssm_client = shared.get_client("ssm", region)
+    config = shared.get_config("dynamodb", ssm_client)
 
-    # Initiating logger
-    logger = alerts.Logger(
-        logger_name = "mannual-restore",
-        log_group_name = log_group_name
-    ).get_logger()
-
-    alert_email_sender = common.get_parameter_from_ssm("bnr-alerts-sender-email", ssm_client)
-    alert_email_receiver = common.get_parameter_from_ssm("bnr-alerts-receiver-email-list", ssm_client)
-
-    emailer = alerts.Emailer(
-        sender = alert_email_sender,
-        receiver =alert_email_receiver.strip().split(",")
-    )
+    # Initiating logger and email alert sinks
+    logger, emailer, _ = alerts.get_alert_sinks("mannual-restore", config)
 
     target_table_name = os.environ.get("TargetTableName")
 
 
-    dynamodb_client = boto3.client('dynamodb', region) 
+    dynamodb_client = shared.get_client('dynamodb', region) 
     ddbresponse = dynamodb_client.delete_table(TableName=target_table_name)       
     print(f"Table {target_table_name} has been  deleted")
 
@@ -1,34 +1,19 @@
-import boto3
 from datetime import datetime
-from context import common, alerts
+from context import common, alerts, shared
 import os, sys, traceback
-from utils import fetch_and_validate_metadata, restore_from_latest_arn
+from utils import fetch_and_validate_metadata, restore_backup, restore_from_latest_arn
 
 region_name = "us-east-1"
 
 # Initializing SSM Client
-ssm_client = boto3.client("ssm", region_name=region_name)
-log_group_name = common.get_parameter_from_ssm("dynamodb-bnr-log-grp-name", ssm_client)
+ssm_client = shared.get_client("ssm", region_name)
+config = shared.get_config("dynamodb", ssm_client)
 
-# Initiating logger
-logger = alerts.Logger(
-    logger_name = "mannual-restore",
-    log_group_name = log_group_name
-).get_logger()
-
-# Initiating teams messenger
-teams_messenger = alerts.TeamsMessenger(webhook_list=["https://trilegiant.webhook.office.com/webhookb2/24b3f38b-6a41-4216-b747-d7693fc34b46@be80116c-1704-4639-8c7f-77ded4343d23/IncomingWebhook/fdfe1ef9ebe549fabc660d7e1f189e33/ce7ec5b7-b9c4-47d6-a605-61bcd8f1cb11"], log_grp_name=log_group_name)
-
-alert_email_sender = common.get_parameter_from_ssm("bnr-alerts-sender-email", ssm_client)
-alert_email_receiver = common.get_parameter_from_ssm("bnr-alerts-receiver-email-list", ssm_client)
-
-emailer = alerts.Emailer(
-    sender = alert_email_sender,
-    receiver =alert_email_receiver.strip().split(",")
-)
+# Initiating logger, email and teams alert sinks
+logger, emailer, teams_messenger = alerts.get_alert_sinks("mannual-restore", config)
 
 try:
-    dynamodb_client = boto3.client('dynamodb', region_name) 
+    dynamodb_client = shared.get_client('dynamodb', region_name) 
     source_table_name = os.environ.get("TableNameForBackup")
     target_table_name = "restored_"+source_table_name+"_"+datetime.now().strftime("%m-%d-%Y-%H-%M-%S")
 
@@ -37,17 +22,20 @@ try:
     
     backup_type = os.environ.get("DynamoDBRestoreMethod")
 
-    s3_client = boto3.client('s3', region_name)
+    s3_client = shared.get_client('s3', region_name)
 
     # To deploy via manual snapshot
     if backup_type == 'Manual':
         backup_arn = os.environ.get("BackupArn")
-        restored_table = dynamodb_client.restore_table_from_backup(
-                                TargetTableName=target_table_name,
-                                BackupArn=backup_arn
-                        )
+        metadata_bucket_name = config.metadata_bucket_name
+        metadata_file_key = config.metadata_file_key
+
+        # Exports are imported using the schema stored in their metadata record
+        backup_record = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client).get_backup(source_table_name, backup_arn) if common.is_export_arn(backup_arn) else None
+        restored_table_name = restore_backup(backup_arn, backup_record, target_table_name, dynamodb_client)
+
         success_title = "DynamoDB Manual Restore Operation Started"
-        success_message = f"DynamoDB Restore process started from backup ARN: {backup_arn}, Name of the restored table is: {restored_table['TableDescription']['TableName']}"
+        success_message = f"DynamoDB Restore process started from backup ARN: {backup_arn}, Name of the restored table is: {restored_table_name}"
         
         # Logging Successful Restore
         logger.info(success_message)
@@ -62,14 +50,7 @@ try:
         )
         
         # Validating from metadata
-        metadata_bucket_name = common.get_parameter_from_ssm("dynamodb-metadata-bucket-name", ssm_client)
-        metadata_file_key = common.get_parameter_from_ssm("dynamodb-metadata-file-key", ssm_client)
-
-        if common.object_exists_in_s3(metadata_bucket_name, metadata_file_key, s3_client):
-            fetch_and_validate_metadata(metadata_bucket_name, metadata_file_key, source_table_name, backup_arn, target_table_name, dynamodb_client, s3_client, logger, emailer, teams_messenger)
-
-        else:
-            logger.info("No Metadata found")
+        fetch_and_validate_metadata(metadata_bucket_name, metadata_file_key, source_table_name, backup_arn, target_table_name, dynamodb_client, s3_client, logger, emailer, teams_messenger)
 
     elif backup_type == 'ManualLatest':
         restore_from_latest_arn(dynamodb_client, region_name, logger, emailer, teams_messenger)
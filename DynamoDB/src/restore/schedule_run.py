@@ -1,34 +1,20 @@
 
 import sys, traceback, os
-import boto3
-from context import common, alerts
+from context import common, alerts, shared
 from utils import restore_from_latest_arn
 
 region = "us-east-1"
 
 # Initializing SSM Client
-ssm_client = boto3.client("ssm", region_name=region)
-log_group_name = common.get_parameter_from_ssm("dynamodb-bnr-log-grp-name", ssm_client)
+ssm_client = shared.get_client("ssm", region)
+config = shared.get_config("dynamodb", ssm_client)
 
-# Initiating logger
-logger = alerts.Logger(
-    logger_name = "schedule-restore",
-    log_group_name = log_group_name
-).get_logger()
-
-alert_email_sender = common.get_parameter_from_ssm("bnr-alerts-sender-email", ssm_client)
-alert_email_receiver = common.get_parameter_from_ssm("bnr-alerts-receiver-email-list", ssm_client)
-
-emailer = alerts.Emailer(
-    sender = alert_email_sender,
-    receiver =alert_email_receiver.strip().split(",")
-)
-
-teams_messenger = alerts.TeamsMessenger(webhook_list=["https://trilegiant.webhook.office.com/webhookb2/24b3f38b-6a41-4216-b747-d7693fc34b46@be80116c-1704-4639-8c7f-77ded4343d23/IncomingWebhook/fdfe1ef9ebe549fabc660d7e1f189e33/ce7ec5b7-b9c4-47d6-a605-61bcd8f1cb11"], log_grp_name=log_group_name)
+# Initiating logger, email and teams alert sinks
+logger, emailer, teams_messenger = alerts.get_alert_sinks("schedule-restore", config)
 
 
 try:
-    dynamodb_client = boto3.client('dynamodb', 'us-east-1')
+    dynamodb_client = shared.get_client('dynamodb', 'us-east-1')
 
     # Since this is scheduled, this will restore last successful manual Backup
     restore_from_latest_arn(dynamodb_client, region, logger, emailer, teams_messenger, is_auto=True)
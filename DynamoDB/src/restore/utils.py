@@ -1,26 +1,75 @@
-import json, time, os, sys, traceback
-import boto3
+import time, os, sys, traceback
 from datetime import datetime
-from context import common
+from context import common, shared
+
+def restore_backup(backup_arn, backup_record, target_table_name, dynamodb_client):
+    """
+    backup_record: Metadata record of the backup, needed for backups taken by the export engine
+
+    Starts restoring a native backup or importing an export into target_table_name, returns the target table name
+    """
+
+    if not common.is_export_arn(backup_arn):
+        restored_table = dynamodb_client.restore_table_from_backup(
+                                TargetTableName=target_table_name,
+                                BackupArn=backup_arn
+                            )
+        return restored_table['TableDescription']['TableName']
+
+    if backup_record is None:
+        raise Exception(f"No Metadata found for export {backup_arn}, it is needed to import the export")
+
+    table_creation_parameters = {
+        **backup_record["table_creation_parameters"],
+        "TableName": target_table_name,
+        "BillingMode": "PAY_PER_REQUEST"
+    }
+    if len(table_creation_parameters.get("GlobalSecondaryIndexes", [])) == 0:
+        table_creation_parameters.pop("GlobalSecondaryIndexes", None)
+    # Records of older exports carry every attribute definition of the table
+    table_creation_parameters["AttributeDefinitions"] = common.get_key_attribute_definitions(
+        table_creation_parameters["AttributeDefinitions"],
+        table_creation_parameters["KeySchema"],
+        table_creation_parameters.get("GlobalSecondaryIndexes", [])
+    )
+
+    dynamodb_client.import_table(
+        S3BucketSource={
+            "S3Bucket": backup_record["export_bucket"],
+            "S3KeyPrefix": common.get_export_data_prefix(backup_record)
+        },
+        InputFormat="DYNAMODB_JSON",
+        InputCompressionType="GZIP",
+        TableCreationParameters=table_creation_parameters
+    )
+    return target_table_name
+
 
 def fetch_and_validate_metadata(metadata_bucket_name, metadata_file_key, source_table_name, backup_arn, target_table_name, dynamodb_client, s3_client, logger, emailer, teams_messenger):
     
-    existing_metadata = common.read_json_from_s3(metadata_bucket_name, metadata_file_key, s3_client)
+    metadata_dict_for_arn = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client).get_backup(source_table_name, backup_arn)
     
-    # If the key for operating table exists in dictionary, extend that dictionary
-    if source_table_name in existing_metadata.keys() and len(existing_metadata[source_table_name]) > 0:
-        metadata_dict_for_arn = next(item for item in existing_metadata[source_table_name] if item["backup_arn"] == backup_arn)
+    # If the operating table has a backup record for restored ARN, validate against it
+    if metadata_dict_for_arn is not None:
         validate_metadata(target_table_name, dynamodb_client, metadata_dict_for_arn, logger, emailer, teams_messenger)
     
     else:
-        print("No Existing Metadata found for selected Table")
+        print("No Existing Metadata found for selected Table and Backup ARN")
+
 
+def validate_metadata(target_table_name, dynamodb_client, metadata_dict, logger, emailer, teams_messenger, validation_mode=None):
+    """
+    validation_mode: 'Sample' verifies the item sample stored with the backup using BatchGetItem,
+                     'Full' scans the whole restored table. Defaults to DynamoDBValidationMode environment variable,
+                     or 'Sample' when it is not set. Backups without a stored sample are always validated in full.
+    """
+    validation_mode = validation_mode or os.environ.get("DynamoDBValidationMode") or "Sample"
 
-def validate_metadata(target_table_name, dynamodb_client, metadata_dict, logger, emailer, teams_messenger):
     loop_count = 0
     while True:
         #restored_table = dynamodb_client.describe_table(TableName=target_table_name)['Table']
-        gsi_count, lsi_count, table_status = common.get_table_info(target_table_name, dynamodb_client)
+        # Status changes while the table is being restored, so it is always described afresh
+        gsi_count, lsi_count, table_status = common.get_table_info(target_table_name, dynamodb_client, max_age=0)
 
         #status = restored_table['TableStatus']
         if table_status in ['CREATING', 'UPDATING']:
@@ -36,12 +85,39 @@ def validate_metadata(target_table_name, dynamodb_client, metadata_dict, logger,
             break
 
     
-    #item_count_in_restored_table = dynamodb_client.scan(TableName=target_table_name, Select='COUNT')['Count']
-    item_count_in_restored_table = common.get_item_count(target_table_name, dynamodb_client)  
-    
-    if metadata_dict["item_count"] == item_count_in_restored_table and metadata_dict["gsi_count"] == gsi_count_in_restored_table and metadata_dict["lsi_count"] == lsi_count_in_restored_table:
+    error_messages = []
+    if metadata_dict["gsi_count"] != gsi_count_in_restored_table:
+        error_messages.append(f"GSI Count in Backup: {metadata_dict['gsi_count']}; GSI count in Restored Table: {gsi_count_in_restored_table}")
+    # ImportTable can not create local secondary indexes, tables restored from exports never have them
+    if metadata_dict["lsi_count"] != lsi_count_in_restored_table and not common.is_export_record(metadata_dict):
+        error_messages.append(f"LSI Count in Backup: {metadata_dict['lsi_count']}; LSI count in Restored Table: {lsi_count_in_restored_table}")
+
+    if validation_mode == "Sample" and len(metadata_dict.get("item_sample", [])) > 0:
+        sample_result = common.verify_item_sample(target_table_name, dynamodb_client, metadata_dict["item_sample"])
+        validation_details = f"{sample_result['matched']} of {sample_result['sample_size']} sampled items matched"
+
+        if sample_result["mismatched"] > 0 or sample_result["missing"] > 0:
+            error_messages.append(f"Sampled items in Backup: {sample_result['sample_size']}; Mismatched in Restored Table: {sample_result['mismatched']}; Missing in Restored Table: {sample_result['missing']}")
+        else:
+            validation_details += f", at most {sample_result['max_differing_fraction']:.2%} of items differ with {common.SAMPLE_CONFIDENCE:.0%} confidence"
+
+    else:
+        #item_count_in_restored_table = dynamodb_client.scan(TableName=target_table_name, Select='COUNT')['Count']
+        # Digest is only verified for backups which stored one, it is computed in the same scan as the item count
+        compute_digest = "item_digest" in metadata_dict
+        checkpoint = common.get_scan_checkpoint(target_table_name, "restore-validation")
+        scan_result = common.scan_table(target_table_name, dynamodb_client, checkpoint=checkpoint, compute_digest=compute_digest)
+        item_count_in_restored_table = scan_result["item_count"]
+        validation_details = f"{item_count_in_restored_table} items matched" + (" with item digest" if compute_digest else "")
+
+        if metadata_dict["item_count"] != item_count_in_restored_table:
+            error_messages.append(f"Item Count in Backup: {metadata_dict['item_count']}; Item count in Restored Table: {item_count_in_restored_table}")
+        if compute_digest and metadata_dict["item_digest"] != scan_result["item_digest"]:
+            error_messages.append(f"Item Digest in Backup: {metadata_dict['item_digest']}; Item Digest in Restored Table: {scan_result['item_digest']}")
+
+    if len(error_messages) == 0:
         success_title = "DynamoDB Table Created and Metadata Validation Succeded"
-        success_message = f"Metadata Validation of DynamoDB table: {target_table_name} succeed"
+        success_message = f"Metadata Validation of DynamoDB table: {target_table_name} succeed, {validation_details}"
         
         # Logging Successful Metadata Validation
         logger.info(success_message)
@@ -60,15 +136,9 @@ def validate_metadata(target_table_name, dynamodb_client, metadata_dict, logger,
         failure_title = "DynamoDB table created but Metadata Validation Failed!"
         logger.error(failure_title)
 
-        if metadata_dict["item_count"] != item_count_in_restored_table:
-            error_message = f"Item Count in Backup: {metadata_dict['item_count']}; Item count in Restored Table: {item_count_in_restored_table}"
-            logger.error(error_message)
-        if metadata_dict["gsi_count"] != gsi_count_in_restored_table:
-            error_message = f"Item Count in Backup: {metadata_dict['gsi_count']}; Item count in Restored Table: {gsi_count_in_restored_table}"
-            logger.error(error_message)
-        else:
-            error_message = f"Item Count in Backup: {metadata_dict['lsi_count']}; Item count in Restored Table: {lsi_count_in_restored_table}"
+        for error_message in error_messages:
             logger.error(error_message)
+        error_message = "\n".join(error_messages)
 
         # Sending Teams Message for Successful Restore
         teams_messenger.send_message(failure_title, f"Restore Validation of DynamoDB table: {target_table_name} failed from latest ARN\nReason: {error_message}")
@@ -80,72 +150,62 @@ def validate_metadata(target_table_name, dynamodb_client, metadata_dict, logger,
                 )
 
 
-def restore_from_latest_arn(dynamodb_client, region, logger, emailer, teams_messenger, is_auto=False):
-    s3_client = boto3.client('s3', region)
-    ssm_client = boto3.client('ssm', region)
+def restore_from_latest_arn(dynamodb_client, region, logger, emailer, teams_messenger, is_auto=False, source_table_name=None, s3_client=None, ssm_client=None, target_table_name=None):
+    """
+    source_table_name: Table whose latest backup is restored, TableNameForBackup environment variable by default
+    s3_client, ssm_client: Clients to reuse, created for the region when not passed
+    target_table_name: Name of the restored table, generated from source_table_name when not passed
+
+    Returns name of the restored table
+    """
 
-    metadata_bucket_name = common.get_parameter_from_ssm("dynamodb-metadata-bucket-name", ssm_client)
-    metadata_file_key = common.get_parameter_from_ssm("dynamodb-metadata-file-key", ssm_client)
+    s3_client = s3_client or shared.get_client('s3', region)
+    ssm_client = ssm_client or shared.get_client('ssm', region)
 
-    source_table_name = os.environ.get("TableNameForBackup")
+    config = shared.get_config("dynamodb", ssm_client)
+    metadata_bucket_name = config.metadata_bucket_name
+    metadata_file_key = config.metadata_file_key
+
+    source_table_name = source_table_name or os.environ.get("TableNameForBackup")
     datetime_str = datetime.now().strftime("%m-%d-%Y-%H-%M-%S")
-    target_table_name = "auto_restored_"+source_table_name+"_"+datetime_str if is_auto else "restored_"+source_table_name+"_"+datetime_str
-
-    # Setting target table name as output parameter
-    os.system(f"echo 'TargetTableName={target_table_name}' >> $GITHUB_OUTPUT")
-
-    if common.object_exists_in_s3(metadata_bucket_name, metadata_file_key, s3_client):
-            existing_metadata = common.read_json_from_s3(metadata_bucket_name, metadata_file_key, s3_client)
-
-            # If the key for operating table exists in dictionary, extend that dictionary
-            if source_table_name in existing_metadata.keys():
-                # Taking latest Restore ARN
-                latest_backup_metadata_dict = sorted(existing_metadata[source_table_name], key=lambda _: _['timestamp'], reverse=True)[0]
-                latest_backup_arn = latest_backup_metadata_dict["backup_arn"]
-
-                # Deploying via manual snapshot
-                restored_table = dynamodb_client.restore_table_from_backup(
-                                        TargetTableName=target_table_name,
-                                        BackupArn=latest_backup_arn
-                                    )
-                
-                success_title = "DynamoDB Restore operation Started"
-                success_message = f"DynamoDB Restore process started from latest backup ARN: {latest_backup_arn}, Name of the restored table is: {restored_table['TableDescription']['TableName']}"
-                
-                # Logging Successful Restore
-                logger.info(success_message)
-
-                # Sending Teams Message for Successful Restore
-                teams_messenger.send_message(title=success_title, message=success_message)
-
-                # Sending Email for Successful Restore
-                emailer.send_success_email(
-                    subject=success_title,
-                    content=success_message
-                )
+    target_table_name = target_table_name or ("auto_restored_"+source_table_name+"_"+datetime_str if is_auto else "restored_"+source_table_name+"_"+datetime_str)
 
-                # Validation
-                validate_metadata(target_table_name, dynamodb_client, latest_backup_metadata_dict, logger, emailer, teams_messenger)
+    # Setting target table name as output parameter, when running in a workflow
+    if os.environ.get("GITHUB_OUTPUT"):
+        os.system(f"echo 'TargetTableName={target_table_name}' >> $GITHUB_OUTPUT")
 
-            else:
-                failure_title =  "DynamoDB Restore Operation Failed"
-                failure_message = f"Restore of DynamoDB table failed from latest ARN\nReason: {failure_message}"
+    # Taking latest Restore ARN
+    latest_backup_metadata_dict = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client).get_latest_backup(source_table_name)
+
+    if latest_backup_metadata_dict is not None:
+        latest_backup_arn = latest_backup_metadata_dict["backup_arn"]
+
+        # Deploying via manual snapshot, or importing the export
+        restored_table_name = restore_backup(latest_backup_arn, latest_backup_metadata_dict, target_table_name, dynamodb_client)
         
-                # Logging Failed Restore
-                logger.error(failure_message)
-                
-                # Sending Teams Message for Failed Restore
-                teams_messenger.send_message(title=failure_title, message=failure_message)
-
-                # Sending Email for Failed Restore
-                emailer.send_failure_email(
-                    subject=failure_title,
-                    content=failure_message
-                )
-                sys.exit(1)
+        success_title = "DynamoDB Restore operation Started"
+        success_message = f"DynamoDB Restore process started from latest backup ARN: {latest_backup_arn}, Name of the restored table is: {restored_table_name}"
+        
+        # Logging Successful Restore
+        logger.info(success_message)
+
+        # Sending Teams Message for Successful Restore
+        teams_messenger.send_message(title=success_title, message=success_message)
+
+        # Sending Email for Successful Restore
+        emailer.send_success_email(
+            subject=success_title,
+            content=success_message
+        )
+
+        # Validation
+        validate_metadata(target_table_name, dynamodb_client, latest_backup_metadata_dict, logger, emailer, teams_messenger)
+
+        return target_table_name
+
     else:
         failure_title = "DynamoDB Restore Operation Failed"
-        failure_message = "No Metadata found"
+        failure_message = f"No Metadata found for table {source_table_name}"
 
         # Logging Failed Restore
         logger.error(failure_message)
@@ -165,26 +225,13 @@ def restore_from_latest_arn(dynamodb_client, region, logger, emailer, teams_mess
 def write_retention_config(table_name, rentntion_period_days, ssm_client, s3_client, logger, emailer):
     
     try:
-        retention_config_bucket_name = common.get_parameter_from_ssm("dynamodb-metadata-bucket-name", ssm_client)
-        retention_config_file_key = common.get_parameter_from_ssm("dynamodb-config-file-key", ssm_client)
-
-        retention_config = {
-            table_name: {
-                "creation_date_time": datetime.now().strftime('%d-%m-%y %H:%M:%S'),
-                "days_to_retain": rentntion_period_days
-            }
-        }
+        config = shared.get_config("dynamodb", ssm_client)
+        retention_config_bucket_name = config.metadata_bucket_name
+        retention_config_file_key = config.config_file_key
 
-        if common.object_exists_in_s3(retention_config_bucket_name, retention_config_file_key, s3_client):
-            existing_config = common.read_json_from_s3(retention_config_bucket_name, retention_config_file_key, s3_client)
-            retention_config.update(existing_config)
-
-        # Write new/updated config Dictionary as JSON
-        s3_client.put_object(
-            Body=json.dumps(retention_config, indent=4, sort_keys=True, default=str),
-            Bucket=retention_config_bucket_name,
-            Key=retention_config_file_key
-        )
+        # Replaces an earlier retention of the table along with its expiry, so cleanup only reads tables that are due
+        metadata_store = common.get_metadata_store(retention_config_bucket_name, retention_config_file_key, s3_client)
+        common.write_table_retention(metadata_store, table_name, rentntion_period_days)
 
         logger.info("Retention config written Successfully!")
 
@@ -1,27 +1,15 @@
-import boto3
 import os
 from utils import write_retention_config
-from context import common, alerts
+from context import common, alerts, shared
 
 region = "us-east-1"
-ssm_client = boto3.client("ssm", region_name=region)
-s3_client = boto3.client('s3', region)
+ssm_client = shared.get_client("ssm", region)
+s3_client = shared.get_client('s3', region)
 
-log_group_name = common.get_parameter_from_ssm("dynamodb-bnr-log-grp-name", ssm_client)
+config = shared.get_config("dynamodb", ssm_client)
 
-# Initiating logger
-logger = alerts.Logger(
-    logger_name = "write-retention-config",
-    log_group_name = log_group_name
-).get_logger()
-
-alert_email_sender = common.get_parameter_from_ssm("bnr-alerts-sender-email", ssm_client)
-alert_email_receiver = common.get_parameter_from_ssm("bnr-alerts-receiver-email-list", ssm_client)
-
-emailer = alerts.Emailer(
-    sender = alert_email_sender,
-    receiver =alert_email_receiver.strip().split(",")
-)
+# Initiating logger and email alert sinks
+logger, emailer, _ = alerts.get_alert_sinks("write-retention-config", config)
 
 target_table_name = os.environ.get("TargetTableName")
 retention_period = os.environ.get("TableRetention")
@@ -0,0 +1,15 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../..')))
+
+# Backup utils import export_engine from their own directory, appended so this directory's utils still comes first
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../backup')))
+
+import common
+import alerts
+import shared
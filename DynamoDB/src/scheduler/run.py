@@ -0,0 +1,175 @@
+import os, sys, threading, time, traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from context import common, alerts, shared
+from utils import SchedulerConfig, get_due_jobs, get_tick, load_module
+
+# Resident scheduler running backup, validation, cleanup and metadata compaction jobs on cron schedules. Jobs are read
+# from the JSON file at SchedulerConfigFile, e.g.
+#
+#   {"jobs": [
+#     {"job": "backup", "table_name": "orders", "cron": "0 2 * * *", "retention_days": "7"},
+#     {"job": "validate", "table_name": "orders", "cron": "0 6 * * 1"},
+#     {"job": "cleanup", "cron": "30 * * * *"},
+#     {"job": "compact", "cron": "15 3 * * *"}
+#   ]}
+#
+# Clients, SSM parameters and alert sinks are created once and shared by every job, jobs run on
+# SchedulerWorkers workers. A job is not started again while its previous run is still running.
+# Metadata stores are created per job, so every run reads the metadata other processes wrote since.
+# An invalid edit of the config file is alerted and the scheduler keeps running the last valid jobs.
+
+DEFAULT_SCHEDULER_WORKERS = 4
+
+backup_utils = load_module("backup_utils", os.path.join(os.path.dirname(__file__), "../backup/utils.py"))
+restore_utils = load_module("restore_utils", os.path.join(os.path.dirname(__file__), "../restore/utils.py"))
+
+region_name = "us-east-1"
+
+# Initializing clients, kept warm for every job
+ssm_client = shared.get_client("ssm", region_name)
+dynamodb_client = shared.get_client('dynamodb', region_name)
+s3_client = shared.get_client('s3', region_name)
+
+config = shared.get_config("dynamodb", ssm_client)
+
+# Initiating logger, email and teams alert sinks
+logger, emailer, teams_messenger = alerts.get_alert_sinks("scheduler", config)
+
+metadata_bucket_name = config.metadata_bucket_name
+metadata_file_key = config.metadata_file_key
+retention_config_file_key = config.config_file_key
+
+
+def send_failure_alert(error_title, reason, trace):
+    logger.error(f"{error_title} {reason}")
+    teams_messenger.send_message(title=error_title, message=reason)
+    emailer.send_failure_email(subject=error_title, content=f"{reason}\nTraceback: {trace}")
+
+
+def run_backup(job):
+    options = backup_utils.get_backup_options()
+    if job.retention_days is not None:
+        options["retention_days"] = str(job.retention_days)
+
+    record = backup_utils.take_backup(job.table_name, region_name, dynamodb_client, options)
+    backup_utils.write_batch_metadata_to_s3({job.table_name: [record]}, s3_client, metadata_bucket_name, metadata_file_key)
+
+    success_title = "DynamoDB Backup Operation Successul"
+    success_message = f"Backup Successfully Created for table {job.table_name}: {record['backup_arn']}"
+    logger.info(success_message)
+    teams_messenger.send_message(title=success_title, message=success_message)
+    emailer.send_success_email(subject=success_title, content=success_message)
+
+
+def run_validation(job):
+    # Restores the latest backup, validates the restored table against its metadata and removes it again
+    target_table_name = f"auto_restored_{job.table_name}_{datetime.now().strftime('%m-%d-%Y-%H-%M-%S')}"
+
+    try:
+        restore_utils.restore_from_latest_arn(
+            dynamodb_client, region_name, logger, emailer, teams_messenger,
+            is_auto=True, source_table_name=job.table_name, s3_client=s3_client, ssm_client=ssm_client,
+            target_table_name=target_table_name
+        )
+
+    # The restored table is removed whether or not it passed validation, "skipped" means it was never created
+    finally:
+        summary = common.delete_tables([target_table_name], dynamodb_client, logger)
+        if len(summary["deleted"]) > 0:
+            logger.info(f"Table {target_table_name} has been deleted after validation")
+        elif len(summary["skipped"]) == 0:
+            logger.error(f"Table {target_table_name} restored for validation could not be deleted, delete it manually")
+
+
+def run_cleanup(job):
+    full_reconcile = os.environ.get("CleanupFullReconcile") == "Yes"
+    metadata_store = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client)
+    retention_config_store = common.get_metadata_store(metadata_bucket_name, retention_config_file_key, s3_client)
+
+    common.cleanup_expired_backups(metadata_store, dynamodb_client, s3_client, logger, full_reconcile)
+    common.cleanup_expired_tables(retention_config_store, dynamodb_client, logger, full_reconcile)
+
+
+def run_compaction(job):
+    # Folds metadata log segments into the snapshots, of the job's table or of every table
+    metadata_store = common.get_metadata_store(metadata_bucket_name, metadata_file_key, s3_client)
+    table_names = [job.table_name] if job.table_name else metadata_store.list_tables()
+    for table_name in table_names:
+        folded_segments = metadata_store.compact(table_name)
+        if folded_segments > 0:
+            logger.info(f"Compacted {folded_segments} metadata log segments of table {table_name}")
+
+
+JOB_RUNNERS = {
+    "backup": run_backup,
+    "validate": run_validation,
+    "cleanup": run_cleanup,
+    "compact": run_compaction
+}
+
+running_jobs = set()
+running_jobs_lock = threading.Lock()
+
+
+def run_job(job):
+    try:
+        logger.info(f"Starting scheduled job {job.name}")
+        JOB_RUNNERS[job.job_type](job)
+        logger.info(f"Scheduled job {job.name} finished")
+
+    # Restore utils exit when there is nothing to restore, which must not stop the scheduler
+    except BaseException as e:
+        send_failure_alert(
+            f"DynamoDB Scheduled Job {job.name} Failed!",
+            f"Scheduled job {job.name} failed\nReason: {type(e).__name__}: {e}",
+            traceback.format_exc()
+        )
+
+    finally:
+        with running_jobs_lock:
+            running_jobs.discard(job.name)
+
+
+try:
+    scheduler_config = SchedulerConfig(os.environ["SchedulerConfigFile"])
+    workers = int(os.environ.get("SchedulerWorkers") or DEFAULT_SCHEDULER_WORKERS)
+
+    last_tick = None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while True:
+            # Waking up at the start of every minute, cron schedules have minute resolution
+            time.sleep(60 - time.time() % 60)
+            tick = get_tick(last_tick)
+            if tick is None:
+                continue
+            last_tick = tick
+
+            try:
+                jobs = scheduler_config.get_jobs()
+            except Exception as e:
+                jobs = scheduler_config.jobs
+                send_failure_alert("DynamoDB Scheduler Config Invalid!", f"{e}\nRunning {len(jobs)} jobs of the last valid config", traceback.format_exc())
+
+            for job in get_due_jobs(jobs, tick):
+                with running_jobs_lock:
+                    if job.name in running_jobs:
+                        logger.error(f"Scheduled job {job.name} is still running, skipping its run at {tick}")
+                        continue
+                    running_jobs.add(job.name)
+
+                executor.submit(run_job, job)
+
+except Exception as e:
+    ex_type, ex, tb = sys.exc_info()
+    error_title = "DynamoDB Scheduler Stopped!"
+    error_message = f"{ex_type}: {ex}"
+    logger.error(error_message)
+    teams_messenger.send_message(title=error_title, message=f"Scheduler stopped\nReason: {error_message}")
+    emailer.send_failure_email(
+                    subject=error_title,
+                    content=f"Scheduler stopped\nReason: {error_message}\nTraceback: {traceback.format_exc()}"
+                )
+    traceback.print_tb(tb)
+    sys.exit(1)
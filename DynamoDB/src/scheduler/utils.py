@@ -0,0 +1,159 @@
+import importlib.util
+import json, os
+from datetime import datetime
+
+JOB_TYPES = ["backup", "validate", "cleanup", "compact"]
+
+# Job types running over every table when they have no table_name
+ALL_TABLE_JOB_TYPES = ["cleanup", "compact"]
+# Cleanup works off the expiry index shared by all tables, it can not be limited to one
+NO_TABLE_JOB_TYPES = ["cleanup"]
+
+# Bounds of the five cron fields: minute, hour, day of month, month, day of week (0 or 7 is Sunday)
+CRON_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def parse_cron_field(field, low, high):
+    """Returns set of values matched by a cron field such as "*", "5", "1-5", "*/15", "0-30/10" or "1,15" """
+
+    values = set()
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start, end = [int(value) for value in value_range.split("-", 1)]
+        else:
+            start = int(value_range)
+            # "5/10" runs from 5 to the end of the range
+            end = high if step else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {field} is out of range {low}-{high}")
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Cron field {field} must have a step of at least 1")
+
+        values.update(range(start, end + 1, step))
+
+    return values
+
+
+class CronSchedule():
+    """Five field cron expression, e.g. "0 2 * * *" runs every day at 02:00"""
+
+    def __init__(self, expression) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression} must have 5 fields")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELD_RANGES)
+        ]
+        if 7 in self.weekdays:
+            self.weekdays.add(0)
+
+        # As in cron, when both day of month and day of week are restricted either of them matching is enough
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def matches(self, time):
+        if time.minute not in self.minutes or time.hour not in self.hours or time.month not in self.months:
+            return False
+
+        day_matches = time.day in self.days
+        # Python weekdays start from Monday as 0, cron ones from Sunday
+        weekday_matches = (time.weekday() + 1) % 7 in self.weekdays
+
+        if self.any_day or self.any_weekday:
+            return day_matches and weekday_matches
+        return day_matches or weekday_matches
+
+
+class ScheduledJob():
+    """A job of the scheduler config, e.g. {"job": "backup", "table_name": "orders", "cron": "0 2 * * *", "retention_days": "7"}"""
+
+    def __init__(self, job) -> None:
+        if job.get("job") not in JOB_TYPES:
+            raise ValueError(f"Job type of {job} must be one of {JOB_TYPES}")
+        if job["job"] not in ALL_TABLE_JOB_TYPES and not job.get("table_name"):
+            raise ValueError(f"Job {job} needs a table_name")
+        if job["job"] in NO_TABLE_JOB_TYPES and job.get("table_name"):
+            raise ValueError(f"Job {job} runs over every table and takes no table_name")
+
+        self.job_type = job["job"]
+        self.table_name = job.get("table_name")
+        self.schedule = CronSchedule(job["cron"])
+        # Overrides BackupRetentionPeriod for backups of this job
+        self.retention_days = job.get("retention_days")
+
+    @property
+    def name(self):
+        return f"{self.job_type}:{self.table_name}" if self.table_name else self.job_type
+
+    def is_due(self, time):
+        return self.schedule.matches(time)
+
+
+class SchedulerConfig():
+    """
+    Jobs of the scheduler, read from a JSON file of the form {"jobs": [...]}
+
+    The file is only read again when it is modified, so schedules can be changed without restarting the scheduler
+    """
+
+    def __init__(self, config_file) -> None:
+        self.config_file = config_file
+        # Never a modification time, so the first call reads the file
+        self.modified_at = -1
+        self.jobs = []
+
+    def get_jobs(self):
+        """
+        Returns jobs of the config file. When it was changed into an invalid config, or removed, the last
+        valid jobs are kept and ValueError is raised, once per change so a bad edit is reported only once
+        """
+
+        try:
+            modified_at = os.path.getmtime(self.config_file)
+        except OSError:
+            modified_at = None
+
+        if modified_at != self.modified_at:
+            self.modified_at = modified_at
+            try:
+                with open(self.config_file) as file:
+                    self.jobs = [ScheduledJob(job) for job in json.load(file).get("jobs", [])]
+            except Exception as e:
+                raise ValueError(f"Scheduler config {self.config_file} is invalid, keeping its last valid jobs. {type(e).__name__}: {e}") from e
+
+        return self.jobs
+
+
+def get_tick(last_tick, now=None):
+    """
+    Returns the minute (now, defaulting to the current time) to run due jobs of, None when it is not
+    after last_tick, so waking up early or the clock being set back never runs a minute's jobs twice
+    """
+
+    tick = (now or datetime.now()).replace(second=0, microsecond=0)
+    return tick if last_tick is None or tick > last_tick else None
+
+
+def get_due_jobs(jobs, time=None):
+    time = time or datetime.now()
+    return [job for job in jobs if job.is_due(time)]
+
+
+def load_module(module_name, file_path):
+    """
+    Imports a script directory's utils under module_name, backup and restore both name theirs utils
+    so they can not be imported by name side by side
+    """
+
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -1,42 +1,30 @@
-import json, os
-import boto3
-from context import common, alerts
+import os
+from context import common, alerts, shared
 
 region_name = common.get_region()
 
 # TODO: Take these below variables from SSM
 BUCKET = 'cassandra-opscenter-metadata-bucket'
 FILE_TO_READ = 'DataAPI_backup_metadata.json'
-from boto3 import client
-
-client = client('s3')
+client = shared.get_client('s3', region_name)
 
 # TODO: Take these below variables from SSM
 BUCKET = 'cassandra-opscenter-metadata-bucket'
 FILE_TO_READ = 'poc_opscenter_metadata.json'
-from boto3 import client
-
-client = client('s3')
-
-# Reading File from s3
-result = client.get_object(Bucket=BUCKET, Key=FILE_TO_READ) 
-text = result["Body"].read().decode()
+client = shared.get_client('s3', region_name)
 
-# Parsing into Python Dictinary
-parsed_dict = json.loads(text)
+# Reading File from s3 and parsing into Python Dictinary
+parsed_dict = common.read_json_from_s3(BUCKET, FILE_TO_READ, client)
 
 #Setting Variables
 cluster_name = parsed_dict['POC']['opscenter_cluster_name']
 opscenter_ip = f"{parsed_dict['POC']['opscenter_ip']}:{parsed_dict['POC']['opscenter_port']}"
 
-ssm_client = boto3.client("ssm", region_name=region_name)
-log_group_name = common.get_parameter_from_ssm("cassandra-bnr-log-grp-name", ssm_client)
+ssm_client = shared.get_client("ssm", region_name)
+config = shared.get_config("cassandra", ssm_client)
 
 # Initiating logger
-logger = alerts.Logger(
-    logger_name = "take-backup",
-    log_group_name = log_group_name
-).get_logger()
+logger = alerts.get_alert_sinks("take-backup", config).logger
 
 
 authentication_response = common.authenticate(opscenter_ip, logger)
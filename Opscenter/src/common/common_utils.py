@@ -1,5 +1,7 @@
-import requests, boto3
-import json, sys, urllib
+import json, sys, urllib.parse
+import shared
+# JSON documents on S3 are read and updated through shared, re-exported here for existing callers
+from shared.s3_json import fetch_json_from_s3, get_json_with_etag_from_s3, read_json_from_s3, update_json_in_s3
 
 def get_parameter_from_ssm(parameter_name, ssm_client, with_decryption=False):
   """
@@ -11,12 +13,18 @@ def get_parameter_from_ssm(parameter_name, ssm_client, with_decryption=False):
   return str(parameter['Parameter']['Value']).strip()
 
 
+def send_request(method, url, headers, data):
+  """Sends a request to the OpsCenter API, requests is imported on the first one so importing common does not load it"""
+  import requests
+  return requests.request(method, url, headers=headers, data=data)
+
+
 def authenticate(opscenter_ip, logger):
   '''Returns session Id which can be used to pass in other methods'''
   # Prepare Request data
   url = f"http://{opscenter_ip}/login"
 
-  ssm_client = boto3.client('ssm', region_name='us-east-1')
+  ssm_client = shared.get_client('ssm', 'us-east-1')
   payload = json.dumps({
     "username": ssm_client.get_parameter(Name="opscenter-poc-user-id")['Parameter']['Value'],
     "password": ssm_client.get_parameter(Name="opscenter-poc-password", WithDecryption=True)['Parameter']['Value']
@@ -26,7 +34,7 @@ def authenticate(opscenter_ip, logger):
   }
 
   # Send Get Request to Opscenter API
-  response = requests.request("POST", url, headers=headers, data=payload)
+  response = send_request("POST", url, headers=headers, data=payload)
   parsed_response = json.loads(response.text)
       
   if 'message' in parsed_response:
@@ -52,7 +60,7 @@ def get_backup_activities(cluster_name, opscenter_ip, session_id, logger, params
     }
 
     # Send Get Request to Opscenter API
-    response = requests.request("GET", url, headers=headers, data=payload)
+    response = send_request("GET", url, headers=headers, data=payload)
     return json.loads(response.text)
 
 
@@ -68,7 +76,7 @@ def get_backups(cluster_name, opscenter_ip, session_id):
     }
 
     # Send Get Request to Opscenter API
-    response = requests.request("GET", url, headers=headers, data=payload)
+    response = send_request("GET", url, headers=headers, data=payload)
 
     return json.loads(response.text)
 
@@ -97,7 +105,7 @@ def add_destination(cluster_name, opscenter_ip, session_id, destination, logger,
 
     print(f"Adding {destination_type} Destination: {destination} with: Server Side Encryption as: {server_side_encryption} and Acceleration Mode as: {acceleration_mode}")
     # Send Post Request to Opscenter API
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = send_request("POST", url, headers=headers, data=payload)
     parsed_response = json.loads(response.text)
 
     #If correct destination is passed, print the success message
@@ -120,7 +128,7 @@ def list_destinations(cluster_name, opscenter_ip, session_id):
       'Cookie': f'TWISTED_SESSION={session_id}'
     }
     # Send Get Request to Opscenter API
-    response = requests.request("GET", url, headers=headers, data=payload)
+    response = send_request("GET", url, headers=headers, data=payload)
 
     return json.loads(response.text)
 
@@ -133,7 +141,7 @@ def get_specific_destination(cluster_name, opscenter_ip, session_id, destination
       'Cookie': f'TWISTED_SESSION={session_id}'
     }
     # Send Get Request to Opscenter API
-    response = requests.request("GET", url, headers=headers, data=payload)
+    response = send_request("GET", url, headers=headers, data=payload)
     parsed_response = json.loads(response.text)
     #If path is in response, it means the request suceeded thus returning the response
     if 'path' in parsed_response:
@@ -159,7 +167,7 @@ def delete_destination(cluster_name, opscenter_ip, session_id, destination_id):
     }
 
     # Send Delete Request to Opscenter API
-    response = requests.request("DELETE", url, headers=headers, data=payload)
+    response = send_request("DELETE", url, headers=headers, data=payload)
     return json.loads(response.text)
 
 
@@ -173,7 +181,7 @@ def get_all_keyspaces_for_cluster(cluster_name, opscenter_ip, session_id):
     }
 
     # Send Get Request to Opscenter API
-    response = requests.request("GET", url, headers=headers, data=payload)
+    response = send_request("GET", url, headers=headers, data=payload)
 
     return json.loads(response.text)
 
@@ -194,9 +202,9 @@ def get_backups_on_s3(cluster_name, opscenter_ip, session_id, logger):
     return backups_on_s3
 
 def get_region():
-  r = requests.get("http://169.254.169.254/latest/dynamic/instance-identity/document")
-  response_json = r.json()
-  return response_json.get('region')
+  """Returns region of this process, see shared.get_region"""
+
+  return shared.get_region()
 
 
 def object_exists_in_s3(s3_bucket, s3_key, s3_client):
@@ -205,21 +213,14 @@ def object_exists_in_s3(s3_bucket, s3_key, s3_client):
   s3_key: loaction of the file
   s3_client: boto3 S3 Client Object
 
-  Returns Boolean
+  Returns Boolean, True only if an object with exactly this key exists
   """
 
-  response = s3_client.list_objects(
-    Bucket = s3_bucket,
-    Prefix = s3_key
-    )
-  if 'ETag' in str(response):
+  # HEAD on the exact key, a prefix listing would also match e.g. "metadata.json.bak"
+  try:
+    s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
     return True
-  else:
-    return False
-
-
-def read_json_from_s3(metadata_bucket_name, metadata_file_key, s3_client):
-  json_file = s3_client.get_object(Bucket=metadata_bucket_name, Key=metadata_file_key)
-  parsed_data = json.loads(json_file["Body"].read().decode())
-  
-  return parsed_data
+  except s3_client.exceptions.ClientError as e:
+    if e.response["Error"]["Code"] in ["404", "NoSuchKey", "NotFound"]:
+      return False
+    raise
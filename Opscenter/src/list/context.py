@@ -7,4 +7,5 @@ sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '../../..')))
 
 import common
-import alerts
\ No newline at end of file
+import alerts
+import shared
\ No newline at end of file
@@ -1,6 +1,6 @@
 import requests
 import json, sys, traceback
-from context import common
+from context import common, shared
 from datetime import datetime
 
 def restore_all_keyspace_from_backup(cluster_name, opscenter_ip, session_id, backup_tag, destination_id):
@@ -136,8 +136,9 @@ def restore_after_configuring_destination(cluster_name, opscenter_ip, session_id
 def write_retention_config(cluster_name, rentntion_period_days, ssm_client, s3_client, logger, emailer):
     
     try:
-        retention_config_bucket_name = common.get_parameter_from_ssm("cassandra-metadata-bucket-name", ssm_client)
-        retention_config_file_key = common.get_parameter_from_ssm("cassandra-config-file-key", ssm_client)
+        config = shared.get_config("cassandra", ssm_client)
+        retention_config_bucket_name = config.metadata_bucket_name
+        retention_config_file_key = config.config_file_key
 
         retention_config = {
             cluster_name: {
@@ -146,15 +147,14 @@ def write_retention_config(cluster_name, rentntion_period_days, ssm_client, s3_c
             }
         }
 
-        if common.object_exists_in_s3(retention_config_bucket_name, retention_config_file_key, s3_client):
-            existing_config = common.read_json_from_s3(retention_config_bucket_name, retention_config_file_key, s3_client)
-            retention_config.update(existing_config)
-
-        # Write new/updated config Dictionary as JSON
-        s3_client.put_object(
-            Body=json.dumps(retention_config, indent=4, sort_keys=True, default=str),
-            Bucket=retention_config_bucket_name,
-            Key=retention_config_file_key
+        # Conditionally merging into the existing config, so concurrent restores do not drop each other's entries
+        common.update_json_in_s3(
+            retention_config_bucket_name,
+            retention_config_file_key,
+            lambda existing_config: {**existing_config, **retention_config},
+            s3_client,
+            default={},
+            indent=4
         )
 
         logger.info("Retention config written Successfully!")
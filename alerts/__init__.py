@@ -1,3 +1,4 @@
 from alerts.logger import Logger
 from alerts.emailer import Emailer
-from alerts.messenger import TeamsMessenger
\ No newline at end of file
+from alerts.messenger import TeamsMessenger
+from alerts.sinks import get_alert_sinks
\ No newline at end of file
@@ -1,5 +1,4 @@
-import boto3
-import requests
+from shared import get_client, get_region
 
 #############################################################################
 ############################# EMAIL UTIL ####################################
@@ -16,15 +15,14 @@ class Emailer():
     CHARSET = "UTF-8"
      
     def __init__(self, **kwargs) -> None:
-
-        r = requests.get("http://169.254.169.254/latest/dynamic/instance-identity/document")
-        response_json = r.json()
-        region = response_json.get('region')
-
-        self.client = boto3.client("ses", region_name=region)
         self.sender = kwargs["sender"]
         self.receiver = kwargs["receiver"]
 
+    @property
+    def client(self):
+        # SES client is created when the first email is sent
+        return get_client("ses", get_region())
+
     def send_success_email(self, **opts):
         content = self.get_success_template(opts["content"])
         
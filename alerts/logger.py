@@ -1,6 +1,5 @@
-import logging
-import watchtower, boto3
-import requests
+import logging, threading
+from shared import get_client, get_region
 
 #############################################################################
 ############################# LOGGER UTIL ####################################
@@ -14,24 +13,55 @@ import requests
 # "logs:CreateLogStream",
 # "logs:PutLogEvents"
 
+class LazyCloudWatchHandler(logging.Handler):
+    """
+    Sends records to CloudWatch Logs. watchtower, the region and the logs client are only loaded
+    when the first record is emitted, so scripts which log nothing do not pay for them.
+    """
+
+    def __init__(self, log_group_name) -> None:
+        super().__init__()
+        self.log_group_name = log_group_name
+        self.handler = None
+        self.handler_lock = threading.Lock()
+
+    def get_handler(self):
+        with self.handler_lock:
+            if self.handler is None:
+                import watchtower
+
+                self.handler = watchtower.CloudWatchLogHandler(
+                    log_group = self.log_group_name,
+                    stream_name = "{logger_name}-{strftime:%Y-%m-%d} [{strftime:%H.%M UTC}]",
+                    create_log_group = True,
+                    boto3_client=get_client("logs", get_region())
+                )
+                self.handler.setFormatter(self.formatter)
+            return self.handler
+
+    def emit(self, record):
+        try:
+            self.get_handler().handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.handler is not None:
+            self.handler.flush()
+
+    def close(self):
+        if self.handler is not None:
+            self.handler.close()
+        super().close()
+
+
 class Logger():
     def __init__(self, **kwargs) -> None:
         logging.basicConfig(level=logging.INFO)
         logger_name = kwargs["logger_name"]
         logger = logging.getLogger(logger_name)
 
-        r = requests.get("http://169.254.169.254/latest/dynamic/instance-identity/document")
-        response_json = r.json()
-        region = response_json.get('region')
-
-        handler = watchtower.CloudWatchLogHandler(
-            log_group = kwargs["log_group_name"],
-            stream_name = "{logger_name}-{strftime:%Y-%m-%d} [{strftime:%H.%M UTC}]",
-            create_log_group = True,
-            boto3_client=boto3.client("logs", region_name=region)
-        )
-
-        logger.addHandler(handler)
+        logger.addHandler(LazyCloudWatchHandler(kwargs["log_group_name"]))
         self.logger = logger
 
     def get_logger(self):
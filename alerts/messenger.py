@@ -1,5 +1,5 @@
-import boto3
-import requests, json
+import json
+from shared import get_region
 from datetime import datetime
 
 class TeamsMessenger():
@@ -7,10 +7,6 @@ class TeamsMessenger():
      
     def __init__(self, webhook_list, log_grp_name, **kwargs) -> None:
 
-        r = requests.get("http://169.254.169.254/latest/dynamic/instance-identity/document")
-        response_json = r.json()
-        self.region = response_json.get('region')
-
         if len(webhook_list) == 0:
             print("INFO: Unable to initiate Teams messanger. Reason: No Webhook URL provided")
             return None
@@ -19,7 +15,14 @@ class TeamsMessenger():
         self.log_grp_name = log_grp_name
 
 
+    @property
+    def region(self):
+        # Resolved when the first message is sent
+        return get_region()
+
     def send_message(self, title, message):
+        import requests
+
         cloud_watch_url = f"https://console.aws.amazon.com/cloudwatch/home?region={self.region}#logsV2:log-groups/log-group/{self.log_grp_name}"
         
         headers = {
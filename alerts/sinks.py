@@ -0,0 +1,43 @@
+from collections import namedtuple
+from alerts.logger import Logger
+from alerts.emailer import Emailer
+from alerts.messenger import TeamsMessenger
+
+#############################################################################
+############################# ALERT SINKS ###################################
+#############################################################################
+
+# Every entry point alerts through the same logger, email and Teams sinks, built from its
+# BnRConfig here so the webhook and the bootstrap live in one place.
+
+TEAMS_WEBHOOK_URLS = [
+    "https://trilegiant.webhook.office.com/webhookb2/24b3f38b-6a41-4216-b747-d7693fc34b46@be80116c-1704-4639-8c7f-77ded4343d23/IncomingWebhook/fdfe1ef9ebe549fabc660d7e1f189e33/ce7ec5b7-b9c4-47d6-a605-61bcd8f1cb11"
+]
+
+AlertSinks = namedtuple("AlertSinks", ["logger", "emailer", "teams_messenger"])
+
+
+def get_alert_sinks(logger_name, config):
+    """
+    logger_name: Name of the logger, also names its CloudWatch log stream
+    config: BnRConfig of the product
+
+    Returns AlertSinks(logger, emailer, teams_messenger)
+    """
+
+    logger = Logger(
+        logger_name = logger_name,
+        log_group_name = config.log_group_name
+    ).get_logger()
+
+    emailer = Emailer(
+        sender = config.alert_email_sender,
+        receiver = config.alert_email_receivers
+    )
+
+    teams_messenger = TeamsMessenger(webhook_list=TEAMS_WEBHOOK_URLS, log_grp_name=config.log_group_name)
+
+    return AlertSinks(logger, emailer, teams_messenger)
+
+################## Usage Example ######################################
+# logger, emailer, teams_messenger = get_alert_sinks("take-backup", config)
@@ -0,0 +1,4 @@
+from shared.clients import get_client, get_max_pool_connections, get_self_throttled_client, get_session
+from shared.config import BnRConfig, MissingParametersError, get_config, get_parameters
+from shared.region import get_region
+from shared.s3_json import fetch_json_from_s3, get_json_with_etag_from_s3, read_json_from_s3, update_json_in_s3
\ No newline at end of file
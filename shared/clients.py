@@ -0,0 +1,82 @@
+import os, threading
+
+#############################################################################
+############################# CLIENT FACTORY ################################
+#############################################################################
+
+# Every client is created from one session and cached per (service, region), boto3
+# clients are thread safe so workers of parallel scans and deletions share them.
+# Creating clients from a session is not thread safe, hence the (reentrant) lock.
+# boto3 is imported on first use, importing this package stays cheap for scripts that never reach AWS.
+
+# Parallel scans run a few segments per core, each holding a connection
+DEFAULT_MAX_POOL_CONNECTIONS = max(50, (os.cpu_count() or 1) * 8)
+# Adaptive retries also rate limit the client when it is being throttled
+RETRY_MODE = "adaptive"
+MAX_RETRY_ATTEMPTS = 10
+# Scans paced by a token bucket and deletions retry throttled calls themselves, their clients hand throttling
+# errors back after a single retry instead of stacking botocore's own retries and rate limiter under theirs
+SELF_THROTTLED_RETRY_MODE = "standard"
+SELF_THROTTLED_TOTAL_ATTEMPTS = 2
+
+session = None
+clients = {}
+clients_lock = threading.RLock()
+
+
+def get_max_pool_connections():
+    """ClientMaxPoolConnections environment variable overrides the connection pool size"""
+
+    return int(os.environ.get("ClientMaxPoolConnections") or DEFAULT_MAX_POOL_CONNECTIONS)
+
+
+def get_client_config(self_throttled=False):
+    from botocore.config import Config
+
+    if self_throttled:
+        retries = {"mode": SELF_THROTTLED_RETRY_MODE, "total_max_attempts": SELF_THROTTLED_TOTAL_ATTEMPTS}
+    else:
+        retries = {"mode": RETRY_MODE, "max_attempts": MAX_RETRY_ATTEMPTS}
+
+    return Config(max_pool_connections=get_max_pool_connections(), retries=retries)
+
+
+def get_session():
+    global session
+
+    with clients_lock:
+        if session is None:
+            import boto3
+            session = boto3.session.Session()
+        return session
+
+
+def get_client(service_name, region_name=None, self_throttled=False):
+    """
+    service_name: e.g. "dynamodb", "s3" or "ssm"
+    region_name: Region of the client, the session's default region when not passed
+    self_throttled: Client for callers retrying throttled calls themselves, see SELF_THROTTLED_TOTAL_ATTEMPTS
+
+    Returns the cached client of the service in the region, creating it on first use
+    """
+
+    client_key = (service_name, region_name, self_throttled)
+
+    with clients_lock:
+        client = clients.get(client_key)
+        if client is None:
+            client = get_session().client(service_name, region_name=region_name, config=get_client_config(self_throttled))
+            clients[client_key] = client
+
+        return client
+
+
+def get_self_throttled_client(client):
+    """Returns the self throttled client of the same service and region as client"""
+
+    return get_client(client.meta.service_model.service_name, client.meta.region_name, self_throttled=True)
+
+################## Usage Example ######################################
+# dynamodb_client = get_client("dynamodb", "us-east-1")
+# dynamodb_client is get_client("dynamodb", "us-east-1")  # True
+# scan_client = get_self_throttled_client(dynamodb_client)
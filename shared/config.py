@@ -0,0 +1,206 @@
+import hashlib, json, logging, os, tempfile, threading, time
+from shared.clients import get_client
+
+#############################################################################
+############################# CONFIG LOADER #################################
+#############################################################################
+
+# SSM parameters are fetched with GetParameters, which takes at most 10 names per call,
+# and cached in memory for SSMCacheTTLSeconds. When SSMCacheKey is set to a Fernet key
+# (e.g. generated once per runner) they are also cached on disk under SSMCacheDir,
+# encrypted with that key, so every script run on the runner shares one fetch.
+# The disk cache needs the cryptography package and is skipped without it.
+# Parameters which do not exist are cached too, as None, so they are not asked for again every time.
+
+MAX_NAMES_PER_CALL = 10
+DEFAULT_CACHE_TTL_SECONDS = 900
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ssm-cache")
+
+# Parameter values keyed by name, kept as (fetched_at, value), value is None for parameters that do not exist
+parameter_cache = {}
+parameter_cache_lock = threading.Lock()
+
+
+class MissingParametersError(Exception):
+    """Required SSM parameters do not exist"""
+
+    def __init__(self, names) -> None:
+        super().__init__(f"SSM parameters do not exist: {', '.join(names)}")
+        self.names = names
+
+
+def get_cache_ttl():
+    return float(os.environ.get("SSMCacheTTLSeconds") or DEFAULT_CACHE_TTL_SECONDS)
+
+
+def get_disk_cache():
+    """Returns (cache directory, Fernet) of the encrypted disk cache, None if it is not enabled"""
+
+    cache_key = os.environ.get("SSMCacheKey")
+    if not cache_key:
+        return None
+
+    # cryptography is only imported when the disk cache is enabled
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        return None
+    return os.environ.get("SSMCacheDir") or DEFAULT_CACHE_DIR, Fernet(cache_key)
+
+
+def get_disk_cache_path(cache_dir, name):
+    return os.path.join(cache_dir, hashlib.sha256(name.encode()).hexdigest())
+
+
+def read_disk_cache(names, ttl):
+    disk_cache = get_disk_cache()
+    if disk_cache is None:
+        return {}
+
+    from cryptography.fernet import InvalidToken
+
+    cache_dir, fernet = disk_cache
+    values = {}
+    for name in names:
+        try:
+            with open(get_disk_cache_path(cache_dir, name), "rb") as cache_file:
+                # Fernet tokens carry their creation time, so expired ones fail to decrypt
+                values[name] = json.loads(fernet.decrypt(cache_file.read(), ttl=int(ttl)))
+        except (OSError, ValueError, InvalidToken):
+            continue
+
+    return values
+
+
+def write_disk_cache(values):
+    disk_cache = get_disk_cache()
+    if disk_cache is None:
+        return
+
+    cache_dir, fernet = disk_cache
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        for name, value in values.items():
+            cache_path = get_disk_cache_path(cache_dir, name)
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}"
+            with open(temp_path, "wb") as cache_file:
+                cache_file.write(fernet.encrypt(json.dumps(value).encode()))
+            os.replace(temp_path, cache_path)
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"Unable to cache SSM parameters on disk. {e}")
+
+
+def get_parameters(names, ssm_client=None, ttl=None, optional=()):
+    """
+    names: Names of SSM parameters to get
+    ssm_client: boto3 SSM Client Object, the shared client when not passed
+    ttl: Seconds cached values are used for, SSMCacheTTLSeconds environment variable by default
+    optional: Names which may not exist, their value is None then
+
+    Returns dictionary of parameter name to its stripped value, raises MissingParametersError
+    if any other parameter does not exist
+    """
+
+    ttl = get_cache_ttl() if ttl is None else ttl
+    now = time.time()
+    values = {}
+
+    with parameter_cache_lock:
+        for name in names:
+            cached = parameter_cache.get(name)
+            if cached is not None and now - cached[0] < ttl:
+                values[name] = cached[1]
+
+    missing_names = [name for name in dict.fromkeys(names) if name not in values]
+    disk_values = read_disk_cache(missing_names, ttl)
+
+    fetched_values = {}
+    missing_names = [name for name in missing_names if name not in disk_values]
+    if len(missing_names) > 0:
+        ssm_client = ssm_client or get_client("ssm")
+
+        for start in range(0, len(missing_names), MAX_NAMES_PER_CALL):
+            response = ssm_client.get_parameters(Names=missing_names[start:start + MAX_NAMES_PER_CALL], WithDecryption=True)
+            for parameter in response["Parameters"]:
+                fetched_values[parameter["Name"]] = str(parameter["Value"]).strip()
+            for name in response.get("InvalidParameters", []):
+                fetched_values[name] = None
+
+        write_disk_cache(fetched_values)
+
+    with parameter_cache_lock:
+        for name, value in {**disk_values, **fetched_values}.items():
+            parameter_cache[name] = (now, value)
+
+    values.update(disk_values)
+    values.update(fetched_values)
+
+    missing_required_names = [name for name in dict.fromkeys(names) if values.get(name) is None and name not in optional]
+    if len(missing_required_names) > 0:
+        raise MissingParametersError(missing_required_names)
+
+    return {name: values.get(name) for name in names}
+
+
+class BnRConfig():
+    """
+    SSM parameters shared by the backup and restore scripts of a product, fetched together.
+    product is the prefix of the product's parameter names, "dynamodb" or "cassandra".
+
+    Scripts use only some of them, so a missing parameter raises MissingParametersError
+    when it is read rather than when the config is loaded.
+    """
+
+    def __init__(self, product, ssm_client=None) -> None:
+        self.product = product
+        self.parameter_names = {
+            "log_group_name": f"{product}-bnr-log-grp-name",
+            "metadata_bucket_name": f"{product}-metadata-bucket-name",
+            "metadata_file_key": f"{product}-metadata-file-key",
+            "config_file_key": f"{product}-config-file-key",
+            "alert_email_sender": "bnr-alerts-sender-email",
+            "alert_email_receiver_list": "bnr-alerts-receiver-email-list"
+        }
+        names = list(self.parameter_names.values())
+        self.values = get_parameters(names, ssm_client, optional=names)
+
+    def get(self, key):
+        name = self.parameter_names[key]
+        if self.values[name] is None:
+            raise MissingParametersError([name])
+        return self.values[name]
+
+    @property
+    def log_group_name(self):
+        return self.get("log_group_name")
+
+    @property
+    def metadata_bucket_name(self):
+        return self.get("metadata_bucket_name")
+
+    @property
+    def metadata_file_key(self):
+        return self.get("metadata_file_key")
+
+    @property
+    def config_file_key(self):
+        return self.get("config_file_key")
+
+    @property
+    def alert_email_sender(self):
+        return self.get("alert_email_sender")
+
+    @property
+    def alert_email_receivers(self):
+        # Optional, there are no receivers when it is not set
+        receiver_list = self.values[self.parameter_names["alert_email_receiver_list"]] or ""
+        return [receiver.strip() for receiver in receiver_list.split(",") if receiver.strip()]
+
+
+def get_config(product, ssm_client=None):
+    return BnRConfig(product, ssm_client)
+
+################## Usage Example ######################################
+# config = get_config("dynamodb", ssm_client)
+# config.metadata_bucket_name, config.metadata_file_key
+# emailer = Emailer(sender=config.alert_email_sender, receiver=config.alert_email_receivers)
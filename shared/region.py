@@ -0,0 +1,67 @@
+import os, threading
+from shared.clients import get_session
+
+#############################################################################
+############################# REGION RESOLVER ###############################
+#############################################################################
+
+# The region is resolved once per process, from the first of
+#   AWS_REGION / AWS_DEFAULT_REGION environment variables
+#   the boto3 session (e.g. region in ~/.aws/config)
+#   the instance metadata service (IMDSv2), when running on EC2
+# Off EC2 (e.g. GitHub hosted runners) IMDS is unreachable, the short timeout keeps that from hanging.
+
+IMDS_URL = "http://169.254.169.254/latest"
+IMDS_TIMEOUT_SECONDS = 2
+IMDS_TOKEN_TTL_SECONDS = 60
+
+region = None
+region_lock = threading.Lock()
+
+
+def get_region_from_imds(timeout=IMDS_TIMEOUT_SECONDS):
+    """Returns region of the EC2 instance from IMDSv2, None if IMDS is not reachable"""
+
+    import requests
+
+    try:
+        token_response = requests.put(
+            f"{IMDS_URL}/api/token",
+            headers={"X-aws-ec2-metadata-token-ttl-seconds": str(IMDS_TOKEN_TTL_SECONDS)},
+            timeout=timeout
+        )
+        token_response.raise_for_status()
+
+        response = requests.get(
+            f"{IMDS_URL}/dynamic/instance-identity/document",
+            headers={"X-aws-ec2-metadata-token": token_response.text},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json().get("region")
+
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def get_region():
+    """Returns the region this process runs in, resolved on first call and reused afterwards"""
+
+    global region
+
+    with region_lock:
+        if region is None:
+            region = (
+                os.environ.get("AWS_REGION")
+                or os.environ.get("AWS_DEFAULT_REGION")
+                or get_session().region_name
+                or get_region_from_imds()
+            )
+
+            if region is None:
+                raise Exception("Unable to resolve AWS region, set AWS_REGION environment variable")
+
+        return region
+
+################## Usage Example ######################################
+# region = get_region()
@@ -0,0 +1,179 @@
+import copy, hashlib, json, os, random, tempfile, threading, time
+
+#############################################################################
+############################# S3 JSON DOCUMENTS #############################
+#############################################################################
+
+# Conditional writes which lost a race are retried on a fresh copy this many times
+MAX_CONDITIONAL_WRITE_ATTEMPTS = 10
+
+# Parsed S3 JSON documents keyed by (bucket, key), kept as (etag, data) for the lifetime of the process
+# and on disk under S3JsonCacheDir (or the temp directory) across runs. S3JsonCacheDir=None disables the disk cache.
+# Documents such as cluster configs are cached unencrypted, so the directory is private to the user running
+# the scripts and is not used when someone else owns it.
+s3_json_cache = {}
+s3_json_cache_lock = threading.Lock()
+DEFAULT_S3_JSON_CACHE_DIR = os.path.join(tempfile.gettempdir(), "s3-json-cache")
+
+
+def get_s3_json_cache_dir():
+    """Returns the disk cache directory, created private (0700) to this user, None if it is disabled or not private"""
+
+    cache_dir = os.environ.get("S3JsonCacheDir") or DEFAULT_S3_JSON_CACHE_DIR
+    if cache_dir == "None":
+        return None
+
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        cache_dir_stat = os.stat(cache_dir)
+        if hasattr(os, "getuid") and cache_dir_stat.st_uid != os.getuid():
+            return None
+        if cache_dir_stat.st_mode & 0o077:
+            os.chmod(cache_dir, 0o700)
+    except OSError:
+        return None
+
+    return cache_dir
+
+
+def get_s3_json_cache_path(s3_bucket, s3_key):
+    cache_dir = get_s3_json_cache_dir()
+    if cache_dir is None:
+        return None
+    return os.path.join(cache_dir, hashlib.sha256(f"{s3_bucket}/{s3_key}".encode()).hexdigest() + ".json")
+
+
+def get_cached_json(s3_bucket, s3_key):
+    """Returns cached (etag, data) of an S3 JSON object from memory or disk, None if it is not cached"""
+
+    with s3_json_cache_lock:
+        if (s3_bucket, s3_key) in s3_json_cache:
+            return s3_json_cache[(s3_bucket, s3_key)]
+
+    cache_path = get_s3_json_cache_path(s3_bucket, s3_key)
+    if cache_path is None or not os.path.exists(cache_path):
+        return None
+
+    try:
+        with open(cache_path) as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    with s3_json_cache_lock:
+        s3_json_cache[(s3_bucket, s3_key)] = (cached["etag"], cached["data"])
+    return cached["etag"], cached["data"]
+
+
+def set_cached_json(s3_bucket, s3_key, etag, data):
+    with s3_json_cache_lock:
+        s3_json_cache[(s3_bucket, s3_key)] = (etag, data)
+
+    cache_path = get_s3_json_cache_path(s3_bucket, s3_key)
+    if cache_path is None:
+        return
+
+    # Disk cache is best effort, the in memory copy is enough for the current process
+    try:
+        temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cache_file:
+            json.dump({"etag": etag, "data": data}, cache_file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+
+
+def drop_cached_json(s3_bucket, s3_key):
+    with s3_json_cache_lock:
+        s3_json_cache.pop((s3_bucket, s3_key), None)
+
+    cache_path = get_s3_json_cache_path(s3_bucket, s3_key)
+    if cache_path is not None and os.path.exists(cache_path):
+        os.remove(cache_path)
+
+
+def fetch_json_from_s3(s3_bucket, s3_key, s3_client):
+    """
+    Returns (data, etag) of an S3 JSON object. Cached copies are revalidated with IfNoneMatch,
+    so an unchanged object costs a 304 response instead of a download and parse.
+    Raises NoSuchKey if the object does not exist.
+    """
+
+    cached = get_cached_json(s3_bucket, s3_key)
+
+    try:
+        if cached is not None:
+            json_file = s3_client.get_object(Bucket=s3_bucket, Key=s3_key, IfNoneMatch=cached[0])
+        else:
+            json_file = s3_client.get_object(Bucket=s3_bucket, Key=s3_key)
+
+    except s3_client.exceptions.NoSuchKey:
+        drop_cached_json(s3_bucket, s3_key)
+        raise
+
+    except s3_client.exceptions.ClientError as e:
+        if cached is not None and e.response["ResponseMetadata"]["HTTPStatusCode"] == 304:
+            # Callers are free to modify what they get, so the cached document is never handed out
+            return copy.deepcopy(cached[1]), cached[0]
+        raise
+
+    data = json.loads(json_file["Body"].read().decode())
+    set_cached_json(s3_bucket, s3_key, json_file["ETag"], data)
+
+    return copy.deepcopy(data), json_file["ETag"]
+
+
+def read_json_from_s3(s3_bucket, s3_key, s3_client):
+    data, _ = fetch_json_from_s3(s3_bucket, s3_key, s3_client)
+    return data
+
+
+def get_json_with_etag_from_s3(s3_bucket, s3_key, s3_client):
+    """Returns parsed JSON object and its ETag, (None, None) if the object does not exist"""
+
+    try:
+        return fetch_json_from_s3(s3_bucket, s3_key, s3_client)
+    except s3_client.exceptions.NoSuchKey:
+        return None, None
+
+
+def update_json_in_s3(s3_bucket, s3_key, update_function, s3_client, default=None, indent=None):
+    """
+    update_function: Receives the current JSON document (or a copy of default if it does not exist) and returns the updated one
+    default: Document to start from when the object does not exist
+
+    Read-modify-write with optimistic concurrency. The write is conditional on the ETag that was read,
+    so a concurrent writer makes it fail instead of being overwritten. It is then retried on the
+    fresh document, which merges both changes.
+
+    Returns the written document
+    """
+
+    for attempt in range(MAX_CONDITIONAL_WRITE_ATTEMPTS):
+        data, etag = get_json_with_etag_from_s3(s3_bucket, s3_key, s3_client)
+        updated_data = update_function(data if data is not None else copy.deepcopy(default))
+
+        # IfNoneMatch makes sure two writers creating the object at the same time do not overwrite each other
+        condition = {"IfMatch": etag} if etag is not None else {"IfNoneMatch": "*"}
+
+        try:
+            response = s3_client.put_object(
+                Body=json.dumps(updated_data, indent=indent, sort_keys=True, default=str),
+                Bucket=s3_bucket,
+                Key=s3_key,
+                **condition
+            )
+            set_cached_json(s3_bucket, s3_key, response["ETag"], copy.deepcopy(updated_data))
+            return updated_data
+
+        except s3_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in ["PreconditionFailed", "ConditionalRequestConflict"]:
+                raise
+
+            # Full jitter backoff, so racing writers do not retry in lockstep
+            time.sleep(random.uniform(0, min(5, 0.1 * 2 ** attempt)))
+
+    raise Exception(f"Unable to update s3://{s3_bucket}/{s3_key}, it kept changing for {MAX_CONDITIONAL_WRITE_ATTEMPTS} attempts")
+
+################## Usage Example ######################################
+# update_json_in_s3(bucket, key, lambda config: {**config, "new_table": {...}}, s3_client, default={})
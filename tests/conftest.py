@@ -0,0 +1,38 @@
+import importlib.util, os, sys
+import pytest
+
+# Scripts find common, alerts and shared through their context modules, tests put the same directories on the path
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DYNAMODB_SRC = os.path.join(REPO_ROOT, "DynamoDB", "src")
+
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, DYNAMODB_SRC)
+
+# No test may reach real AWS, nor share the S3 JSON disk cache with other runs
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ["S3JsonCacheDir"] = "None"
+
+
+
+@pytest.fixture
+def load_script():
+    """
+    Returns a loader of script directory modules such as backup/utils.py, imported under a module name
+    of the test's choosing since backup and restore both name theirs utils. The script's directory is
+    put on the path as running it would, so its context and sibling modules resolve.
+    """
+
+    def load(module_name, script_path):
+        script_path = os.path.join(DYNAMODB_SRC, script_path)
+        sys.path.insert(0, os.path.dirname(script_path))
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, script_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(os.path.dirname(script_path))
+        return module
+
+    return load
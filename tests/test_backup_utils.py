@@ -0,0 +1,89 @@
+import sys, time
+import pytest
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def dynamodb_client():
+    import boto3
+
+    with moto.mock_aws():
+        dynamodb_client = boto3.client("dynamodb", region_name="us-east-1")
+        dynamodb_client.create_table(
+            TableName="orders",
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        yield dynamodb_client
+
+
+def test_pipelined_backup_is_deleted_when_the_scan_fails(load_script, dynamodb_client, monkeypatch):
+    backup_utils = load_script("backup_utils", "backup/utils.py")
+
+    def failing_scan(*args, **kwargs):
+        raise RuntimeError("scan failed")
+
+    monkeypatch.setattr(backup_utils, "create_metadata_before_backup", failing_scan)
+    options = {**backup_utils.get_backup_options(), "pipelined": True}
+
+    with pytest.raises(RuntimeError):
+        backup_utils.take_backup("orders", "us-east-1", dynamodb_client, options)
+
+    assert dynamodb_client.list_backups(TableName="orders")["BackupSummaries"] == []
+
+
+class BusyBackupClient():
+    """DynamoDB client whose backups are still being created for the first delete_backup calls"""
+
+    def __init__(self, dynamodb_client, busy_calls) -> None:
+        self.dynamodb_client = dynamodb_client
+        self.busy_calls = busy_calls
+
+    def __getattr__(self, name):
+        return getattr(self.dynamodb_client, name)
+
+    def delete_backup(self, **kwargs):
+        if self.busy_calls > 0:
+            self.busy_calls -= 1
+            raise self.dynamodb_client.exceptions.BackupInUseException({"Error": {"Code": "BackupInUseException", "Message": "CREATING"}}, "DeleteBackup")
+        return self.dynamodb_client.delete_backup(**kwargs)
+
+
+def test_orphaned_backup_deletion_waits_for_its_creation(load_script, dynamodb_client, monkeypatch):
+    backup_utils = load_script("backup_utils", "backup/utils.py")
+    cleanup_utils = sys.modules["common.cleanup_utils"]
+    monkeypatch.setattr(cleanup_utils, "get_self_throttled_client", lambda client: client)
+    monkeypatch.setattr(cleanup_utils, "get_backoff_delay", lambda attempt: 0)
+
+    def failing_scan(*args):
+        raise RuntimeError("scan failed")
+
+    monkeypatch.setattr(backup_utils, "create_metadata_before_backup", failing_scan)
+    options = {**backup_utils.get_backup_options(), "pipelined": True}
+
+    with pytest.raises(RuntimeError):
+        backup_utils.take_backup("orders", "us-east-1", BusyBackupClient(dynamodb_client, busy_calls=2), options)
+
+    assert dynamodb_client.list_backups(TableName="orders")["BackupSummaries"] == []
+
+
+def test_failed_pipelined_backup_stops_the_scan(load_script, dynamodb_client, monkeypatch):
+    backup_utils = load_script("backup_utils", "backup/utils.py")
+    scanned_pages = []
+
+    def endless_scan(*args):
+        cancel_check = args[-1]
+        while len(scanned_pages) < 1000:
+            cancel_check()
+            scanned_pages.append(None)
+            time.sleep(0.01)
+        pytest.fail("the scan was not stopped")
+
+    monkeypatch.setattr(backup_utils, "create_metadata_before_backup", endless_scan)
+    options = {**backup_utils.get_backup_options(), "pipelined": True}
+
+    with pytest.raises(dynamodb_client.exceptions.TableNotFoundException):
+        backup_utils.take_backup("missing", "us-east-1", dynamodb_client, options)
+    assert len(scanned_pages) < 1000
@@ -0,0 +1,66 @@
+import logging
+import pytest
+from datetime import datetime, timedelta
+from common.cleanup_utils import cleanup_expired_tables, write_table_retention
+from common.metadata_utils import ExpiryIndex, LocalMetadataStore, get_expiry_prefix
+
+moto = pytest.importorskip("moto")
+
+RETENTION_CONFIG_KEY = "dynamodb/retention.json"
+TABLE_NAMES = ["restored_extended", "restored_forever", "restored_expired"]
+
+logger = logging.getLogger("test-cleanup")
+
+
+@pytest.fixture
+def dynamodb_client():
+    import boto3
+
+    with moto.mock_aws():
+        dynamodb_client = boto3.client("dynamodb", region_name="us-east-1")
+        for table_name in TABLE_NAMES:
+            dynamodb_client.create_table(
+                TableName=table_name,
+                KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST"
+            )
+        yield dynamodb_client
+
+
+@pytest.fixture
+def retention_store(tmp_path):
+    retention_store = LocalMetadataStore(str(tmp_path), RETENTION_CONFIG_KEY)
+    # An index that was built before, so cleanup reads only due entries
+    ExpiryIndex(retention_store, get_expiry_prefix(RETENTION_CONFIG_KEY)).add([], create=True)
+    return retention_store
+
+
+def test_changed_retention_replaces_the_expiry(retention_store, dynamodb_client):
+    created_at = (datetime.now() - timedelta(days=2)).strftime("%d-%m-%y %H:%M:%S")
+    for table_name in TABLE_NAMES:
+        write_table_retention(retention_store, table_name, "1", created_at)
+
+    write_table_retention(retention_store, "restored_extended", "30", created_at)
+    write_table_retention(retention_store, "restored_forever", "0", created_at)
+
+    due_tables = [entry["table_name"] for entry in ExpiryIndex(retention_store, get_expiry_prefix(RETENTION_CONFIG_KEY)).get_due()]
+    assert due_tables == ["restored_expired"]
+
+    cleanup_expired_tables(retention_store, dynamodb_client, logger)
+    assert sorted(dynamodb_client.list_tables()["TableNames"]) == ["restored_extended", "restored_forever"]
+    assert sorted(retention_store.read_document(RETENTION_CONFIG_KEY, {})) == ["restored_extended", "restored_forever"]
+
+
+def test_outdated_expiry_entries_are_not_deleted(retention_store, dynamodb_client):
+    created_at = (datetime.now() - timedelta(days=2)).strftime("%d-%m-%y %H:%M:%S")
+    write_table_retention(retention_store, "restored_extended", "30", created_at)
+
+    # An entry left behind by an older retention, e.g. written before retentions were replaced
+    expiry_index = ExpiryIndex(retention_store, get_expiry_prefix(RETENTION_CONFIG_KEY))
+    expiry_index.add([{"id": "restored_extended", "table_name": "restored_extended", "expires_at": datetime.now().timestamp() - 60 * 60}])
+
+    summary = cleanup_expired_tables(retention_store, dynamodb_client, logger)
+    assert summary["deleted"] == []
+    assert "restored_extended" in dynamodb_client.list_tables()["TableNames"]
+    assert expiry_index.get_due() == []
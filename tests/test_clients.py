@@ -0,0 +1,21 @@
+import pytest
+import shared
+from shared import clients
+
+pytest.importorskip("boto3")
+
+
+@pytest.fixture(autouse=True)
+def client_cache(monkeypatch):
+    monkeypatch.setattr(clients, "clients", {})
+
+
+def test_self_throttled_clients_barely_retry():
+    dynamodb_client = shared.get_client("dynamodb", "eu-west-1")
+    scan_client = shared.get_self_throttled_client(dynamodb_client)
+
+    assert scan_client is not dynamodb_client
+    assert scan_client is shared.get_self_throttled_client(dynamodb_client)
+    assert scan_client.meta.region_name == "eu-west-1"
+    assert dynamodb_client.meta.config.retries == {"mode": clients.RETRY_MODE, "total_max_attempts": clients.MAX_RETRY_ATTEMPTS + 1}
+    assert scan_client.meta.config.retries == {"mode": "standard", "total_max_attempts": 2}
@@ -0,0 +1,59 @@
+import pytest
+import shared
+from shared import config
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def ssm_client(monkeypatch):
+    import boto3
+
+    monkeypatch.setattr(config, "parameter_cache", {})
+    monkeypatch.delenv("SSMCacheKey", raising=False)
+
+    with moto.mock_aws():
+        ssm_client = boto3.client("ssm", region_name="us-east-1")
+        ssm_client.put_parameter(Name="dynamodb-bnr-log-grp-name", Value=" backups ", Type="String")
+        ssm_client.put_parameter(Name="dynamodb-metadata-bucket-name", Value="metadata", Type="String")
+        yield ssm_client
+
+
+class CountingClient():
+    """SSM client counting GetParameters calls"""
+
+    def __init__(self, ssm_client) -> None:
+        self.ssm_client = ssm_client
+        self.calls = 0
+
+    def get_parameters(self, **kwargs):
+        self.calls += 1
+        return self.ssm_client.get_parameters(**kwargs)
+
+
+def test_missing_parameters_raise_unless_optional(ssm_client):
+    with pytest.raises(shared.MissingParametersError) as error:
+        shared.get_parameters(["dynamodb-bnr-log-grp-name", "dynamodb-config-file-key"], ssm_client)
+    assert error.value.names == ["dynamodb-config-file-key"]
+
+    values = shared.get_parameters(["dynamodb-bnr-log-grp-name", "dynamodb-config-file-key"], ssm_client, optional=["dynamodb-config-file-key"])
+    assert values == {"dynamodb-bnr-log-grp-name": "backups", "dynamodb-config-file-key": None}
+
+
+def test_missing_parameters_are_cached(ssm_client):
+    counting_client = CountingClient(ssm_client)
+    names = ["dynamodb-bnr-log-grp-name", "dynamodb-config-file-key"]
+
+    shared.get_parameters(names, counting_client, optional=names)
+    shared.get_parameters(names, counting_client, optional=names)
+    assert counting_client.calls == 1
+
+
+def test_config_raises_when_a_missing_parameter_is_read(ssm_client):
+    bnr_config = shared.get_config("dynamodb", ssm_client)
+
+    assert bnr_config.log_group_name == "backups"
+    assert bnr_config.metadata_bucket_name == "metadata"
+    assert bnr_config.alert_email_receivers == []
+    with pytest.raises(shared.MissingParametersError):
+        bnr_config.metadata_file_key
@@ -0,0 +1,40 @@
+import pytest
+from common.metadata_utils import LocalMetadataStore
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def clients():
+    import boto3
+
+    with moto.mock_aws():
+        dynamodb_client = boto3.client("dynamodb", region_name="us-east-1")
+        for table_name, backup_tag in [("payments", "Yes"), ("orders", "yes"), ("sessions", "No"), ("scratch", None)]:
+            dynamodb_client.create_table(
+                TableName=table_name,
+                KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+                Tags=[{"Key": "Backup", "Value": backup_tag}] if backup_tag else []
+            )
+        yield dynamodb_client, boto3.client("resourcegroupstaggingapi", region_name="us-east-1")
+
+
+def test_tables_tagged_for_backup_are_discovered(load_script, clients, tmp_path):
+    discovery = load_script("discovery", "backup/discovery.py")
+    dynamodb_client, tagging_client = clients
+    metadata_store = LocalMetadataStore(str(tmp_path), "dynamodb/metadata.json")
+
+    assert discovery.get_backup_tables(metadata_store, tagging_client, "us-east-1") == ["orders", "payments"]
+
+    # Reused while the discovery document is fresh
+    dynamodb_client.tag_resource(ResourceArn=dynamodb_client.describe_table(TableName="sessions")["Table"]["TableArn"], Tags=[{"Key": "Backup", "Value": "Yes"}])
+    assert discovery.get_backup_tables(metadata_store, tagging_client, "us-east-1") == ["orders", "payments"]
+    assert discovery.get_backup_tables(metadata_store, tagging_client, "us-east-1", ttl_seconds=0) == ["orders", "payments", "sessions"]
+
+
+def test_table_name_of_any_partition(load_script):
+    discovery = load_script("discovery", "backup/discovery.py")
+
+    assert discovery.get_table_name("arn:aws-cn:dynamodb:cn-north-1:123456789012:table/orders") == "orders"
@@ -0,0 +1,175 @@
+import json, logging, posixpath, sys, time
+import pytest
+from datetime import datetime, timezone
+
+moto = pytest.importorskip("moto")
+
+REGION = "us-east-1"
+EXPORT_BUCKET = "exports"
+
+
+class ExportingClient():
+    """
+    DynamoDB client filling in what moto's exports lack: export ARNs of the real "/export/" form,
+    the ExportManifest and ExportTime of DescribeExport and the manifest-summary.json they point to
+    """
+
+    def __init__(self, dynamodb_client, s3_client) -> None:
+        self.dynamodb_client = dynamodb_client
+        self.s3_client = s3_client
+
+    def __getattr__(self, name):
+        return getattr(self.dynamodb_client, name)
+
+    def export_table_to_point_in_time(self, **kwargs):
+        response = self.dynamodb_client.export_table_to_point_in_time(**kwargs)
+        export = response["ExportDescription"]
+        export["ExportArn"] = export["ExportArn"].replace("/import/", "/export/")
+        return response
+
+    def describe_export(self, ExportArn):
+        response = self.dynamodb_client.describe_export(ExportArn=ExportArn.replace("/export/", "/import/"))
+        export = response["ExportDescription"]
+        export["ExportArn"] = ExportArn
+        if export["ExportStatus"] != "COMPLETED":
+            return response
+
+        # Data files are written to <prefix>/AWSDynamoDB/<export id>/data/, the manifest next to that directory
+        data_key = self.s3_client.list_objects_v2(Bucket=export["S3Bucket"], Prefix=export["S3Prefix"] + "/AWSDynamoDB/")["Contents"][0]["Key"]
+        manifest_key = posixpath.join(posixpath.dirname(posixpath.dirname(data_key)), "manifest-summary.json")
+        self.s3_client.put_object(
+            Bucket=export["S3Bucket"],
+            Key=manifest_key,
+            Body=json.dumps({"itemCount": export["ItemCount"], "billedSizeBytes": export["BilledSizeBytes"]})
+        )
+
+        export["ExportManifest"] = manifest_key
+        export["ExportTime"] = datetime.now(timezone.utc)
+        return response
+
+
+class AlertRecorder():
+    """Stands in for the emailer and the teams messenger, recording what they were sent"""
+
+    def __init__(self) -> None:
+        self.successes = []
+        self.failures = []
+
+    def send_success_email(self, subject, content):
+        self.successes.append(content)
+
+    def send_failure_email(self, subject, content):
+        self.failures.append(content)
+
+    def send_message(self, title, message):
+        (self.failures if "Failed" in title else self.successes).append(message)
+
+
+@pytest.fixture
+def clients():
+    import boto3
+
+    with moto.mock_aws():
+        dynamodb_client = boto3.client("dynamodb", region_name=REGION)
+        s3_client = boto3.client("s3", region_name=REGION)
+        s3_client.create_bucket(Bucket=EXPORT_BUCKET)
+
+        dynamodb_client.create_table(
+            TableName="orders",
+            KeySchema=[{"AttributeName": "customer", "KeyType": "HASH"}, {"AttributeName": "order", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "customer", "AttributeType": "S"},
+                {"AttributeName": "order", "AttributeType": "S"},
+                {"AttributeName": "status", "AttributeType": "S"},
+                {"AttributeName": "created", "AttributeType": "N"}
+            ],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "by-status",
+                "KeySchema": [{"AttributeName": "status", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"}
+            }],
+            LocalSecondaryIndexes=[{
+                "IndexName": "by-created",
+                "KeySchema": [{"AttributeName": "customer", "KeyType": "HASH"}, {"AttributeName": "created", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"}
+            }],
+            BillingMode="PAY_PER_REQUEST"
+        )
+        dynamodb_client.update_continuous_backups(
+            TableName="orders",
+            PointInTimeRecoverySpecification={"PointInTimeRecoveryEnabled": True}
+        )
+
+        for number in range(5):
+            dynamodb_client.put_item(TableName="orders", Item={
+                "customer": {"S": f"customer-{number % 2}"},
+                "order": {"S": f"order-{number}"},
+                "status": {"S": "open"},
+                "created": {"N": str(number)}
+            })
+
+        yield ExportingClient(dynamodb_client, s3_client), s3_client
+
+
+def wait_for_import(dynamodb_client, table_name, item_count):
+    """Returns items of the imported table once it holds item_count of them, moto imports in a thread"""
+
+    items = []
+    for _ in range(100):
+        try:
+            items = dynamodb_client.scan(TableName=table_name)["Items"]
+        except dynamodb_client.exceptions.ResourceNotFoundException:
+            pass
+        if len(items) >= item_count:
+            break
+        time.sleep(0.05)
+    return items
+
+
+def test_export_is_imported_back(load_script, clients, monkeypatch):
+    dynamodb_client, s3_client = clients
+    backup_utils = load_script("backup_utils", "backup/utils.py")
+    restore_utils = load_script("restore_utils", "restore/utils.py")
+    monkeypatch.setattr(sys.modules["export_engine"], "EXPORT_POLL_SECONDS", 0.05)
+
+    options = {**backup_utils.get_backup_options(), "engine": "Export", "export_bucket": EXPORT_BUCKET, "retention_days": "7"}
+    monkeypatch.setattr(backup_utils.shared, "get_client", lambda service_name, region_name=None: s3_client)
+    record = backup_utils.take_backup("orders", REGION, dynamodb_client, options)
+
+    assert record["engine"] == "export"
+    assert record["item_count"] == 5
+    # The local secondary index's sort key can not be imported
+    assert sorted(definition["AttributeName"] for definition in record["table_creation_parameters"]["AttributeDefinitions"]) == ["customer", "order", "status"]
+
+    restore_utils.restore_backup(record["backup_arn"], record, "orders-restored", dynamodb_client)
+    restored_items = wait_for_import(dynamodb_client, "orders-restored", 5)
+    assert sorted(item["order"]["S"] for item in restored_items) == [f"order-{number}" for number in range(5)]
+    restored_table = dynamodb_client.describe_table(TableName="orders-restored")["Table"]
+    assert [index["IndexName"] for index in restored_table["GlobalSecondaryIndexes"]] == ["by-status"]
+
+    # The restored table has no local secondary index, which must not fail its validation
+    alerts = AlertRecorder()
+    restore_utils.validate_metadata("orders-restored", dynamodb_client, record, logging.getLogger("test-export"), alerts, alerts, validation_mode="Full")
+    assert alerts.failures == []
+    assert len(alerts.successes) == 2
+
+
+def test_export_needs_a_bucket(load_script, clients):
+    dynamodb_client, _ = clients
+    backup_utils = load_script("backup_utils", "backup/utils.py")
+    options = {**backup_utils.get_backup_options(), "engine": "Export", "export_bucket": None}
+
+    with pytest.raises(ValueError, match="ExportBucketName"):
+        backup_utils.take_backup("orders", REGION, dynamodb_client, options)
+
+
+def test_waiting_for_an_export_times_out(load_script, monkeypatch):
+    export_engine = load_script("export_engine", "backup/export_engine.py")
+    monkeypatch.setattr(export_engine, "EXPORT_POLL_SECONDS", 0.01)
+
+    class RunningExportClient():
+        def describe_export(self, ExportArn):
+            return {"ExportDescription": {"ExportArn": ExportArn, "ExportStatus": "IN_PROGRESS"}}
+
+    with pytest.raises(Exception, match="did not finish within"):
+        export_engine.wait_for_export("arn:aws:dynamodb:us-east-1:123456789012:table/orders/export/1", RunningExportClient(), timeout=0.05)
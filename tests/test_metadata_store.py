@@ -0,0 +1,153 @@
+import pytest
+from common.metadata_utils import ExpiryIndex, LocalMetadataStore, MetadataStore, S3MetadataStore, get_backup_expiry_entry
+
+METADATA_FILE_KEY = "dynamodb/metadata.json"
+
+
+def get_record(backup_arn, timestamp):
+    return {"backup_arn": backup_arn, "timestamp": timestamp, "backup_retention_days": "7"}
+
+
+def reopen(metadata_store):
+    """Returns a new store over the same data, without the indexes the given store has cached"""
+
+    if isinstance(metadata_store, LocalMetadataStore):
+        return LocalMetadataStore(metadata_store.root_dir, METADATA_FILE_KEY)
+    return S3MetadataStore(metadata_store.s3_bucket, METADATA_FILE_KEY, metadata_store.s3_client)
+
+
+@pytest.fixture(params=["local", "s3"])
+def metadata_store(request, tmp_path):
+    if request.param == "local":
+        yield LocalMetadataStore(str(tmp_path), METADATA_FILE_KEY)
+        return
+
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="metadata")
+        yield S3MetadataStore("metadata", METADATA_FILE_KEY, s3_client)
+
+
+def test_metadata_store_is_abstract():
+    with pytest.raises(TypeError):
+        MetadataStore(METADATA_FILE_KEY)
+
+
+def test_append_and_read(metadata_store):
+    metadata_store.append("orders", [get_record("arn-2", 200), get_record("arn-1", 100)])
+    metadata_store.append_tables({"orders": [get_record("arn-3", 300)], "payments": [get_record("arn-4", 400)]})
+
+    assert [record["backup_arn"] for record in metadata_store.read_table("orders")] == ["arn-1", "arn-2", "arn-3"]
+    assert sorted(metadata_store.list_tables()) == ["orders", "payments"]
+    assert metadata_store.read_table("missing") == []
+
+
+def test_lookups(metadata_store):
+    metadata_store.append("orders", [get_record("arn-1", 100), get_record("arn-2", 200), get_record("arn-3", 300)])
+
+    assert metadata_store.get_backup("orders", "arn-2")["timestamp"] == 200
+    assert metadata_store.get_backup("orders", "arn-9") is None
+    assert metadata_store.get_latest_backup("orders")["backup_arn"] == "arn-3"
+    assert metadata_store.get_backup_before("orders", 250)["backup_arn"] == "arn-2"
+    assert metadata_store.get_backup_before("orders", 50) is None
+
+
+def test_lookups_do_not_read_the_history(metadata_store):
+    metadata_store.append("orders", [get_record("arn-1", 100), get_record("arn-2", 200)])
+    metadata_store.append("orders", [get_record("arn-3", 300)])
+
+    reader = reopen(metadata_store)
+    reader.build_table_index = lambda table_name: pytest.fail("read the table's history")
+
+    assert reader.get_latest_backup("orders")["backup_arn"] == "arn-3"
+    assert reader.get_backup("orders", "arn-2")["timestamp"] == 200
+
+    metadata_store.delete("orders", ["arn-1"])
+    assert reader.get_backup("orders", "arn-1") is None
+
+
+def test_latest_lookup_follows_deletions(metadata_store):
+    metadata_store.append("orders", [get_record("arn-1", 100), get_record("arn-2", 200)])
+
+    metadata_store.delete("orders", ["arn-2"])
+    assert reopen(metadata_store).get_latest_backup("orders")["backup_arn"] == "arn-1"
+
+    metadata_store.delete("orders", ["arn-1"])
+    assert reopen(metadata_store).get_latest_backup("orders") is None
+
+
+def test_lookups_of_backups_recorded_before_lookups(tmp_path):
+    class PreLookupStore(LocalMetadataStore):
+        def update_lookups(self, table_name, events):
+            pass
+
+    PreLookupStore(str(tmp_path), METADATA_FILE_KEY).append("orders", [get_record("arn-1", 100), get_record("arn-2", 200)])
+    metadata_store = LocalMetadataStore(str(tmp_path), METADATA_FILE_KEY)
+
+    assert metadata_store.get_backup("orders", "arn-1")["timestamp"] == 100
+    assert metadata_store.get_latest_backup("orders")["backup_arn"] == "arn-2"
+
+    # The first write seeds the latest lookup from the history
+    metadata_store.append("orders", [get_record("arn-0", 50)])
+    assert metadata_store.read_document(metadata_store.get_latest_lookup_key("orders"))["record"]["backup_arn"] == "arn-2"
+
+
+def test_delete_and_update(metadata_store):
+    metadata_store.append("orders", [get_record("arn-1", 100), get_record("arn-2", 200)])
+    metadata_store.delete("orders", ["arn-1"])
+    metadata_store.update_table("orders", lambda records: records + [get_record("arn-3", 300)])
+
+    assert [record["backup_arn"] for record in metadata_store.read_table("orders")] == ["arn-2", "arn-3"]
+
+
+def test_compaction_keeps_records(metadata_store):
+    for timestamp in range(5):
+        metadata_store.append("orders", [get_record(f"arn-{timestamp}", timestamp)])
+    metadata_store.delete("orders", ["arn-0"])
+
+    assert metadata_store.compact("orders") == 6
+    assert metadata_store.compact("orders") == 0
+
+    assert [record["backup_arn"] for record in reopen(metadata_store).read_table("orders")] == ["arn-1", "arn-2", "arn-3", "arn-4"]
+
+
+def test_migrate(metadata_store):
+    metadata_store.update_document(METADATA_FILE_KEY, lambda _: {"orders": [get_record("arn-1", 100)]}, {})
+
+    assert metadata_store.migrate() == ["orders"]
+    assert metadata_store.migrate() == ["orders"]
+    assert [record["backup_arn"] for record in metadata_store.read_table("orders")] == ["arn-1"]
+
+
+def test_read_racing_a_compaction(tmp_path):
+    class RacingStore(LocalMetadataStore):
+        """Compacts the table right after the reader listed its log, as a concurrent compaction could"""
+
+        raced = False
+
+        def read_snapshot(self, table_name):
+            if not self.raced:
+                self.raced = True
+                snapshot = super().read_snapshot(table_name)
+                reopen(self).compact(table_name)
+                return snapshot
+            return super().read_snapshot(table_name)
+
+    writer = LocalMetadataStore(str(tmp_path), METADATA_FILE_KEY)
+    writer.append("orders", [get_record("arn-1", 100)])
+    writer.append("orders", [get_record("arn-2", 200)])
+
+    assert [record["backup_arn"] for record in RacingStore(str(tmp_path), METADATA_FILE_KEY).read_table("orders")] == ["arn-1", "arn-2"]
+
+
+def test_backup_expiry_entry():
+    assert get_backup_expiry_entry("orders", {"backup_arn": "arn-1", "timestamp": 100, "backup_retention_days": None}) is None
+    assert get_backup_expiry_entry("orders", {"backup_arn": "arn-1", "timestamp": 100}) is None
+    # An empty workflow input, or anything else that is not a whole number, is no retention
+    assert get_backup_expiry_entry("orders", {"backup_arn": "arn-1", "timestamp": 100, "backup_retention_days": ""}) is None
+    assert get_backup_expiry_entry("orders", {"backup_arn": "arn-1", "timestamp": 100, "backup_retention_days": "7d"}) is None
+    assert get_backup_expiry_entry("orders", {"backup_arn": "arn-1", "timestamp": 100, "backup_retention_days": "1"})["expires_at"] == 100 + 24 * 60 * 60
+    assert ExpiryIndex(None, "expiry").get_day(24 * 60 * 60 - 1) == "1970-01-01"
@@ -0,0 +1,123 @@
+import os
+import pytest
+from common.scan_utils import ScanCheckpoint, scan_table, verify_item_sample
+
+moto = pytest.importorskip("moto")
+
+ITEMS = [
+    {
+        "id": {"S": f"item-{number}"},
+        "tags": {"SS": ["red", "green", "blue"]},
+        "sizes": {"NS": ["1", "10", "2.5"]},
+        "payload": {"B": bytes([number, 1, 2])},
+        "details": {"M": {"codes": {"BS": [b"a", b"b"]}, "history": {"L": [{"N": str(number)}, {"S": "created"}]}}}
+    }
+    for number in range(20)
+]
+
+
+def reverse_sets(value):
+    """Returns AttributeValue with the members of every set in reverse order"""
+
+    (data_type, data), = value.items()
+    if data_type in ["SS", "NS", "BS"]:
+        return {data_type: list(reversed(data))}
+    if data_type == "M":
+        return {"M": {name: reverse_sets(item) for name, item in data.items()}}
+    if data_type == "L":
+        return {"L": [reverse_sets(item) for item in data]}
+    return value
+
+
+@pytest.fixture
+def dynamodb_client():
+    import boto3
+
+    with moto.mock_aws():
+        yield boto3.client("dynamodb", region_name="us-east-1")
+
+
+def create_table(dynamodb_client, table_name, items):
+    dynamodb_client.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    for item in items:
+        dynamodb_client.put_item(TableName=table_name, Item=item)
+
+
+def test_digest_does_not_depend_on_order(dynamodb_client):
+    create_table(dynamodb_client, "forward", ITEMS)
+    create_table(dynamodb_client, "reversed", [{name: reverse_sets(value) for name, value in item.items()} for item in reversed(ITEMS)])
+
+    digests = [
+        scan_table("forward", dynamodb_client, total_segments=1, compute_digest=True)["item_digest"],
+        scan_table("forward", dynamodb_client, total_segments=4, compute_digest=True)["item_digest"],
+        scan_table("reversed", dynamodb_client, total_segments=3, compute_digest=True)["item_digest"]
+    ]
+
+    assert digests[0] is not None
+    assert digests == [digests[0]] * 3
+
+
+def test_digest_changes_with_one_attribute(dynamodb_client):
+    changed_items = [dict(item) for item in ITEMS]
+    changed_items[7]["tags"] = {"SS": ["red", "green", "purple"]}
+    create_table(dynamodb_client, "original", ITEMS)
+    create_table(dynamodb_client, "changed", changed_items)
+
+    original = scan_table("original", dynamodb_client, total_segments=2, compute_digest=True)
+    changed = scan_table("changed", dynamodb_client, total_segments=2, compute_digest=True)
+
+    assert original["item_count"] == changed["item_count"] == len(ITEMS)
+    assert original["item_digest"] != changed["item_digest"]
+
+
+def test_verify_item_sample(dynamodb_client):
+    create_table(dynamodb_client, "source", ITEMS)
+    item_sample = scan_table("source", dynamodb_client, total_segments=2, sample_size=len(ITEMS))["item_sample"]
+    assert len(item_sample) == len(ITEMS)
+
+    create_table(dynamodb_client, "restored", ITEMS)
+    result = verify_item_sample("restored", dynamodb_client, item_sample)
+    assert (result["sample_size"], result["matched"], result["mismatched"], result["missing"]) == (len(ITEMS), len(ITEMS), 0, 0)
+
+    dynamodb_client.put_item(TableName="restored", Item={**ITEMS[3], "sizes": {"NS": ["1"]}})
+    dynamodb_client.delete_item(TableName="restored", Key={"id": ITEMS[5]["id"]})
+    result = verify_item_sample("restored", dynamodb_client, item_sample)
+
+    assert (result["matched"], result["mismatched"], result["missing"]) == (len(ITEMS) - 2, 1, 1)
+
+
+def test_interrupted_scan_resumes_from_its_checkpoint(dynamodb_client, tmp_path):
+    create_table(dynamodb_client, "orders", ITEMS)
+    uninterrupted = scan_table("orders", dynamodb_client, total_segments=4, compute_digest=True)
+
+    checkpoint_path = str(tmp_path / "orders.json")
+    scanned_pages = []
+
+    def interrupt_after_two_pages():
+        if len(scanned_pages) >= 2:
+            raise RuntimeError("interrupted")
+        scanned_pages.append(None)
+
+    # Segments are scanned one after another, each of them is a single page
+    with pytest.raises(RuntimeError):
+        scan_table(
+            "orders", dynamodb_client, total_segments=4, compute_digest=True, max_workers=1,
+            checkpoint=ScanCheckpoint(checkpoint_path, interval=0), cancel_check=interrupt_after_two_pages
+        )
+    assert os.path.exists(checkpoint_path)
+
+    scanned_pages.clear()
+    resumed = scan_table(
+        "orders", dynamodb_client, total_segments=4, compute_digest=True, max_workers=1,
+        checkpoint=ScanCheckpoint(checkpoint_path, interval=0), cancel_check=lambda: scanned_pages.append(None)
+    )
+
+    # Only the two unfinished segments are scanned again
+    assert len(scanned_pages) == 2
+    assert (resumed["item_count"], resumed["item_digest"]) == (uninterrupted["item_count"], uninterrupted["item_digest"])
+    assert not os.path.exists(checkpoint_path)
@@ -0,0 +1,87 @@
+import json, os
+import pytest
+from datetime import datetime
+
+
+@pytest.fixture
+def scheduler_utils(load_script):
+    return load_script("scheduler_utils", "scheduler/utils.py")
+
+
+@pytest.mark.parametrize("field, values", [
+    ("*", set(range(0, 60))),
+    ("5", {5}),
+    ("1-5", {1, 2, 3, 4, 5}),
+    ("*/15", {0, 15, 30, 45}),
+    ("0-30/10", {0, 10, 20, 30}),
+    ("50/5", {50, 55}),
+    ("1,15,40-42", {1, 15, 40, 41, 42}),
+])
+def test_parse_cron_field(scheduler_utils, field, values):
+    assert scheduler_utils.parse_cron_field(field, 0, 59) == values
+
+
+@pytest.mark.parametrize("field", ["*/0", "60", "5-1", "a", "1-"])
+def test_parse_cron_field_rejects_invalid_fields(scheduler_utils, field):
+    with pytest.raises(ValueError):
+        scheduler_utils.parse_cron_field(field, 0, 59)
+
+
+def test_cron_schedule(scheduler_utils):
+    daily = scheduler_utils.CronSchedule("30 2 * * *")
+    assert daily.matches(datetime(2024, 5, 17, 2, 30))
+    assert not daily.matches(datetime(2024, 5, 17, 2, 31))
+
+    # 2024-05-19 is a Sunday, which cron writes as 0 or 7
+    assert scheduler_utils.CronSchedule("0 0 * * 7").matches(datetime(2024, 5, 19))
+    assert scheduler_utils.CronSchedule("0 0 * * 0").matches(datetime(2024, 5, 19))
+    assert not scheduler_utils.CronSchedule("0 0 * * 1-5").matches(datetime(2024, 5, 19))
+
+    # Either restricted day field matching is enough
+    first_or_monday = scheduler_utils.CronSchedule("0 0 1 * 1")
+    assert first_or_monday.matches(datetime(2024, 5, 1))
+    assert first_or_monday.matches(datetime(2024, 5, 20))
+    assert not first_or_monday.matches(datetime(2024, 5, 21))
+
+    with pytest.raises(ValueError):
+        scheduler_utils.CronSchedule("0 0 * *")
+
+
+def test_scheduled_job_needs_a_table(scheduler_utils):
+    assert scheduler_utils.ScheduledJob({"job": "compact", "cron": "0 3 * * *"}).name == "compact"
+    assert scheduler_utils.ScheduledJob({"job": "backup", "table_name": "orders", "cron": "0 3 * * *"}).name == "backup:orders"
+
+    with pytest.raises(ValueError):
+        scheduler_utils.ScheduledJob({"job": "backup", "cron": "0 3 * * *"})
+    with pytest.raises(ValueError):
+        scheduler_utils.ScheduledJob({"job": "restore", "table_name": "orders", "cron": "0 3 * * *"})
+
+    # Compaction can be limited to one table, cleanup always covers every table
+    assert scheduler_utils.ScheduledJob({"job": "compact", "table_name": "orders", "cron": "0 3 * * *"}).name == "compact:orders"
+    with pytest.raises(ValueError):
+        scheduler_utils.ScheduledJob({"job": "cleanup", "table_name": "orders", "cron": "0 3 * * *"})
+
+
+def test_ticks_never_repeat(scheduler_utils):
+    tick = scheduler_utils.get_tick(None, datetime(2024, 5, 1, 2, 0, 0, 5000))
+    assert tick == datetime(2024, 5, 1, 2, 0)
+
+    # Woken up just before the minute, or the clock set back
+    assert scheduler_utils.get_tick(tick, datetime(2024, 5, 1, 1, 59, 59, 999000)) is None
+    assert scheduler_utils.get_tick(tick, datetime(2024, 5, 1, 2, 0, 30)) is None
+    assert scheduler_utils.get_tick(tick, datetime(2024, 5, 1, 2, 1, 0, 1000)) == datetime(2024, 5, 1, 2, 1)
+
+
+def test_scheduler_config_keeps_last_valid_jobs(scheduler_utils, tmp_path):
+    config_file = tmp_path / "scheduler.json"
+    config_file.write_text(json.dumps({"jobs": [{"job": "cleanup", "cron": "30 * * * *"}]}))
+    scheduler_config = scheduler_utils.SchedulerConfig(str(config_file))
+    assert [job.name for job in scheduler_config.get_jobs()] == ["cleanup"]
+
+    config_file.write_text(json.dumps({"jobs": [{"job": "cleanup", "cron": "*/0 * * * *"}]}))
+    os.utime(config_file, (1, 1))
+    with pytest.raises(ValueError):
+        scheduler_config.get_jobs()
+
+    # Reported once, then the last valid jobs keep running until the file changes again
+    assert [job.name for job in scheduler_config.get_jobs()] == ["cleanup"]
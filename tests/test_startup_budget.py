@@ -0,0 +1,114 @@
+import json, os, subprocess, sys
+import pytest
+from conftest import REPO_ROOT
+
+# Seconds and number of loaded modules an entry point may take until its first AWS call,
+# STARTUP_BUDGET_SECONDS overrides the time budget on slow machines
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS") or 2.0)
+STARTUP_BUDGET_MODULES = 200
+# requests and urllib3 alone bring about a hundred modules
+REQUESTS_BUDGET_MODULES = 150
+
+# Heavy packages which are only imported once a script actually needs them
+DEFERRED_MODULES = ["boto3", "botocore", "watchtower", "cryptography", "requests"]
+
+# Opscenter scripts importing their directory's utils talk to OpsCenter right away, requests is loaded for them
+ENTRY_POINTS = [
+    ("DynamoDB/src/backup/run.py", DEFERRED_MODULES),
+    ("DynamoDB/src/backup/batch_run.py", DEFERRED_MODULES),
+    ("DynamoDB/src/restore/manual_run.py", DEFERRED_MODULES),
+    ("DynamoDB/src/restore/schedule_run.py", DEFERRED_MODULES),
+    ("DynamoDB/src/restore/delete_table_post_scheduled_restore.py", DEFERRED_MODULES),
+    ("DynamoDB/src/restore/write_retention_config.py", DEFERRED_MODULES),
+    ("DynamoDB/src/list/run.py", DEFERRED_MODULES),
+    ("DynamoDB/src/common/cleanup_snapshots.py", DEFERRED_MODULES),
+    ("DynamoDB/src/common/cleanup_manually_restored_tables.py", DEFERRED_MODULES),
+    ("DynamoDB/src/common/compact_metadata.py", DEFERRED_MODULES),
+    ("DynamoDB/src/common/migrate_metadata.py", DEFERRED_MODULES),
+    ("DynamoDB/src/scheduler/run.py", DEFERRED_MODULES),
+    ("Opscenter/src/backup/run.py", DEFERRED_MODULES[:-1]),
+    ("Opscenter/src/backup/list_keyspaces.py", DEFERRED_MODULES),
+    ("Opscenter/src/list/run.py", DEFERRED_MODULES),
+    ("Opscenter/src/restore/manual_run.py", DEFERRED_MODULES[:-1]),
+    ("Opscenter/src/restore/schedule_run.py", DEFERRED_MODULES[:-1]),
+    ("Opscenter/src/restore/write_retention_config.py", DEFERRED_MODULES[:-1]),
+]
+
+# Runs a script as "python <script>" would, with every AWS client replaced by a stub which records
+# the loaded modules and elapsed time at the first call and then stops the script
+RUNNER = """
+import json, os, runpy, sys, time
+started_at = time.perf_counter()
+
+script_path, repo_root = sys.argv[1], sys.argv[2]
+sys.argv = [script_path]
+sys.path[0] = os.path.dirname(script_path)
+sys.path.append(repo_root)
+
+import shared.clients
+
+class FirstAwsCall(BaseException):
+    pass
+
+first_call = {}
+
+class StubClient():
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def __getattr__(self, operation):
+        def call(*args, **kwargs):
+            if not first_call:
+                first_call.update(
+                    call=f"{self.service_name}.{operation}",
+                    seconds=time.perf_counter() - started_at,
+                    modules=sorted(sys.modules)
+                )
+            raise FirstAwsCall()
+        return call
+
+class StubSession():
+    def client(self, service_name, **kwargs):
+        return StubClient(service_name)
+
+shared.clients.get_session = StubSession
+shared.clients.get_client_config = lambda self_throttled=False: None
+
+try:
+    runpy.run_path(script_path, run_name="__main__")
+except BaseException:
+    pass
+
+print("FIRST AWS CALL " + json.dumps(first_call))
+"""
+
+
+def get_first_aws_call(script_path, tmp_path):
+    environment = {
+        **os.environ,
+        "AWS_REGION": "us-east-1",
+        "TableNameForBackup": "orders",
+        "ClusterNameForBackup": "cluster",
+        "SchedulerConfigFile": str(tmp_path / "scheduler.json"),
+        "GITHUB_OUTPUT": str(tmp_path / "github_output")
+    }
+    environment.pop("SSMCacheKey", None)
+
+    result = subprocess.run(
+        [sys.executable, "-c", RUNNER, script_path, REPO_ROOT],
+        cwd=os.path.dirname(script_path), env=environment, capture_output=True, text=True, timeout=60
+    )
+    report = [line for line in result.stdout.splitlines() if line.startswith("FIRST AWS CALL ")]
+    assert len(report) == 1, result.stderr
+    return json.loads(report[0][len("FIRST AWS CALL "):])
+
+
+@pytest.mark.parametrize("entry_point, deferred_modules", ENTRY_POINTS, ids=[entry_point for entry_point, _ in ENTRY_POINTS])
+def test_entry_point_startup_budget(entry_point, deferred_modules, tmp_path):
+    first_call = get_first_aws_call(os.path.join(REPO_ROOT, entry_point), tmp_path)
+    assert first_call, f"{entry_point} made no AWS call"
+
+    loaded_modules = set(first_call["modules"])
+    assert [module for module in deferred_modules if module in loaded_modules] == []
+    assert len(loaded_modules) <= STARTUP_BUDGET_MODULES + (0 if "requests" in deferred_modules else REQUESTS_BUDGET_MODULES)
+    assert first_call["seconds"] <= STARTUP_BUDGET_SECONDS
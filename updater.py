@@ -1,13 +1,13 @@
-import boto3
 import os
 import json
 import sys
 import re
+from shared import get_client
 
 pattern = re.compile(r"^[A-Z][0-9]{6}$")
 bucket = os.environ["BUCKET"]
 sid = os.environ["SID"]
-client = boto3.client("s3")
+client = get_client("s3")
 
 tags_json = {
     "Name": os.environ["NAME"],